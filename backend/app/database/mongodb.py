@@ -33,11 +33,13 @@ class MongoDBManager:
     async def initialize(self):
         """Initialize MongoDB connection and Beanie ODM."""
         try:
-            # Create MongoDB client
+            # Create MongoDB client. Motor runs operations on its own thread
+            # pool, sized by MOTOR_MAX_WORKERS at import time (see
+            # docker/Dockerfile.backend); keep it >= maxPoolSize.
             self.client = AsyncIOMotorClient(
                 settings.MONGODB_URL,
-                maxPoolSize=50,
-                minPoolSize=10,
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
                 maxIdleTimeMS=30000,
                 serverSelectionTimeoutMS=5000,
                 connectTimeoutMS=10000,
@@ -4,7 +4,7 @@ Enhanced Qdrant client and collection management for RAG system.
 """
 
 import logging
-from typing import Optional, List, Dict, Any, Union
+from typing import Optional, List, Dict, Any, Tuple, Union
 from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.models import (
     Distance, VectorParams, PointStruct, Filter, FieldCondition, 
@@ -14,12 +14,16 @@ from qdrant_client.models import (
     ScalarType, ScalarQuantizationConfig
 )
 import asyncio
+import time
 import uuid
 
 from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Collection topology rarely changes; avoid a Qdrant round-trip on every probe
+COLLECTION_INFO_TTL_SECONDS = 30.0
+
 
 class QdrantManager:
     """Qdrant vector database manager with enhanced functionality."""
@@ -29,6 +33,7 @@ class QdrantManager:
         self.sync_client: Optional[QdrantClient] = None
         self._is_initialized = False
         self.collection_name = settings.QDRANT_COLLECTION_NAME
+        self._collection_info_cache: Dict[str, Tuple[float, CollectionInfo]] = {}
 
     async def initialize(self):
         """Initialize Qdrant client and ensure collection exists."""
@@ -38,8 +43,8 @@ class QdrantManager:
                 url=settings.QDRANT_URL,
                 api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None,
                 timeout=30.0,
-                grpc_port=6334,
-                prefer_grpc=False
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC
             )
             
             # Initialize sync client for some operations
@@ -47,7 +52,8 @@ class QdrantManager:
                 url=settings.QDRANT_URL,
                 api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None,
                 timeout=30.0,
-                prefer_grpc=False
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC
             )
             
             # Test connection
@@ -68,7 +74,7 @@ class QdrantManager:
         """Ensure the main RAG collection exists with optimal configuration."""
         try:
             collections = await self.client.get_collections()
-            collection_names = [col.name for col in collections.collections]
+            collection_names = {col.name for col in collections.collections}
             
             if self.collection_name not in collection_names:
                 logger.info(f"Creating Qdrant collection: {self.collection_name}")
@@ -119,7 +125,7 @@ class QdrantManager:
             
             # Get collection info if it exists
             collection_info = None
-            if self.collection_name in [col.name for col in collections.collections]:
+            if self.collection_name in {col.name for col in collections.collections}:
                 collection_info = await self.client.get_collection(self.collection_name)
             
             return {
@@ -164,6 +170,8 @@ class QdrantManager:
                     points=batch,
                     wait=True
                 )
+                # Point counts changed; drop cached info even if a later batch fails
+                self._collection_info_cache.pop(self.collection_name, None)
                 
                 logger.debug(f"Upserted batch {i//batch_size + 1}/{(total_points + batch_size - 1)//batch_size}")
             
@@ -253,6 +261,7 @@ class QdrantManager:
                 points_selector=delete_filter,
                 wait=True
             )
+            self._collection_info_cache.pop(self.collection_name, None)
             
             operation_id = result.operation_id if hasattr(result, 'operation_id') else 'unknown'
             logger.info(f"Deleted points for user {user_id}" + 
@@ -265,10 +274,18 @@ class QdrantManager:
             logger.error(f"Failed to delete points: {str(e)}")
             raise
 
-    async def get_collection_info(self) -> Optional[CollectionInfo]:
-        """Get detailed collection information."""
+    async def get_collection_info(self, use_cache: bool = True) -> Optional[CollectionInfo]:
+        """Get detailed collection information (cached for a short TTL)."""
+        now = time.monotonic()
+        if use_cache:
+            cached = self._collection_info_cache.get(self.collection_name)
+            if cached and now - cached[0] < COLLECTION_INFO_TTL_SECONDS:
+                return cached[1]
+        
         try:
-            return await self.client.get_collection(self.collection_name)
+            collection_info = await self.client.get_collection(self.collection_name)
+            self._collection_info_cache[self.collection_name] = (now, collection_info)
+            return collection_info
         except Exception as e:
             logger.error(f"Failed to get collection info: {str(e)}")
             return None
@@ -286,6 +303,7 @@ class QdrantManager:
                     max_optimization_threads=2
                 )
             )
+            self._collection_info_cache.pop(self.collection_name, None)
             
             logger.info("Collection optimization completed")
             return True
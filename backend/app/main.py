@@ -11,6 +11,7 @@ from app.database import mongodb_manager, qdrant_manager
 # from app.services.rag_service import rag_service  # Disabled until ML dependencies installed
 from app.services.gcp_service import gcp_service
 from app.services.rag_upload_service import rag_upload_service
+from app.services.document_processor import shutdown_process_pool
 from app.api import api_v1_router
 from app.services.model_router import model_router, ModelMessage, ModelRole
 from app.services.context_manager import context_manager, MessagePriority
@@ -68,6 +69,7 @@ async def lifespan(app: FastAPI):
     await close_database()
     await mongodb_manager.close()
     await qdrant_manager.close()
+    shutdown_process_pool()
     print("✅ All connections closed")
 
 
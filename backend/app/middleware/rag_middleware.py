@@ -3,15 +3,17 @@ RAG System Middleware
 Provides rate limiting, request validation, and security controls for RAG endpoints.
 """
 
+import re
+import math
 import time
 import json
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple, Union
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request as StarletteRequest
 import asyncio
-from collections import defaultdict, deque
+import redis.asyncio as aioredis
 from datetime import datetime, timedelta
 import logging
 
@@ -19,53 +21,138 @@ from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Connect/read timeout for Redis rate limit checks
+REDIS_RATE_LIMIT_TIMEOUT_SECONDS = 0.25
+
+# Patterns stripped by sanitize_input, compiled once into a single alternation
+_DANGEROUS_INPUT_PATTERNS = [
+    "<script",
+    "</script>",
+    "javascript:",
+    "data:text/html",
+    "vbscript:",
+    "onload=",
+    "onerror=",
+]
+_DANGEROUS_INPUT_RE = re.compile("|".join(map(re.escape, _DANGEROUS_INPUT_PATTERNS)))
+
+# Document extensions accepted by validate_document_type (without the dot)
+_ALLOWED_DOCUMENT_EXTENSIONS = frozenset({"pdf", "txt", "doc", "docx", "md", "rtf", "odt"})
+
+
+def _token_bucket_info(limit: int, window_seconds: int, tokens: float, allowed: bool) -> Dict[str, Any]:
+    """Build the rate limit info for a token bucket left with `tokens` tokens."""
+    rate = limit / window_seconds  # tokens refilled per second
+    # Bucket is back to full capacity once the deficit is refilled
+    reset_time = time.time() + (limit - tokens) / rate
+    
+    return {
+        "limit": limit,
+        "remaining": int(tokens),
+        "reset": int(reset_time),
+        "retry_after": math.ceil((1.0 - tokens) / rate) if not allowed else 0
+    }
+
 
 class RateLimitStore:
-    """In-memory rate limit store with sliding window."""
+    """In-memory rate limit store using a lazily refilled token bucket.
+    
+    Each key holds up to `limit` tokens, refilled continuously at
+    limit / window_seconds per second; a request spends one token.
+    """
     
     def __init__(self):
-        self.requests: Dict[str, deque] = defaultdict(deque)
+        # key -> (tokens, last_refill_monotonic); two floats per key
+        self.buckets: Dict[str, Tuple[float, float]] = {}
         self.lock = asyncio.Lock()
     
     async def is_allowed(self, key: str, limit: int, window_seconds: int) -> tuple[bool, Dict[str, Any]]:
         """Check if request is allowed and return rate limit info."""
         async with self.lock:
-            now = time.time()
-            window_start = now - window_seconds
+            now = time.monotonic()
+            rate = limit / window_seconds  # tokens refilled per second
             
-            # Clean old requests
-            request_times = self.requests[key]
-            while request_times and request_times[0] < window_start:
-                request_times.popleft()
+            # Refill for the time elapsed since the last request
+            tokens, last_refill = self.buckets.get(key, (float(limit), now))
+            tokens = min(float(limit), tokens + (now - last_refill) * rate)
             
             # Check limit
-            current_requests = len(request_times)
-            allowed = current_requests < limit
-            
+            allowed = tokens >= 1.0
             if allowed:
-                request_times.append(now)
+                tokens -= 1.0
             
-            # Calculate reset time
-            if request_times:
-                oldest_request = request_times[0]
-                reset_time = oldest_request + window_seconds
-            else:
-                reset_time = now + window_seconds
+            self.buckets[key] = (tokens, now)
             
-            return allowed, {
-                "limit": limit,
-                "remaining": max(0, limit - current_requests - (1 if allowed else 0)),
-                "reset": int(reset_time),
-                "retry_after": max(0, int(reset_time - now)) if not allowed else 0
-            }
+            return allowed, _token_bucket_info(limit, window_seconds, tokens, allowed)
+
+
+class RedisRateLimitStore:
+    """Redis-backed rate limit store shared by all workers.
+    
+    Implements the same token bucket as RateLimitStore, so limits and the
+    returned info mean the same thing whichever store is live.
+    """
+    
+    # Refill, spend and store the bucket atomically in one RTT, using the Redis
+    # clock so all workers agree on elapsed time. A bucket left alone for a full
+    # window is back at capacity, so the key expires then. Tokens are returned
+    # as a string because Redis truncates Lua numbers to integers.
+    _TOKEN_BUCKET_SCRIPT = """
+    local limit = tonumber(ARGV[1])
+    local window = tonumber(ARGV[2])
+    local clock = redis.call('TIME')
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or limit
+    local last = tonumber(state[2]) or now
+    tokens = math.min(limit, tokens + math.max(0, now - last) * limit / window)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(window))
+    return {allowed, tostring(tokens)}
+    """
+    
+    def __init__(self, redis_url: str, key_prefix: str = "rl:"):
+        # Short timeouts so a slow or unreachable Redis raises quickly and the
+        # in-memory fallback kicks in instead of stalling every request
+        self.redis = aioredis.from_url(
+            redis_url,
+            socket_connect_timeout=REDIS_RATE_LIMIT_TIMEOUT_SECONDS,
+            socket_timeout=REDIS_RATE_LIMIT_TIMEOUT_SECONDS
+        )
+        self.key_prefix = key_prefix
+        self._script = self.redis.register_script(self._TOKEN_BUCKET_SCRIPT)
+        # Used when Redis is unreachable so requests are still limited per process
+        self.fallback = RateLimitStore()
+    
+    async def is_allowed(self, key: str, limit: int, window_seconds: int) -> tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed and return rate limit info."""
+        try:
+            allowed, tokens = await self._script(
+                keys=[f"{self.key_prefix}{key}"], args=[limit, window_seconds]
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limit check failed, using in-memory store: {str(e)}")
+            return await self.fallback.is_allowed(key, limit, window_seconds)
+        
+        allowed = bool(allowed)
+        return allowed, _token_bucket_info(limit, window_seconds, float(tokens), allowed)
 
 
 class RAGSecurityMiddleware(BaseHTTPMiddleware):
     """Security middleware for RAG endpoints."""
     
-    def __init__(self, app, rate_limit_store: Optional[RateLimitStore] = None):
+    def __init__(self, app, rate_limit_store: Optional[Union[RateLimitStore, RedisRateLimitStore]] = None):
         super().__init__(app)
-        self.rate_limit_store = rate_limit_store or RateLimitStore()
+        if rate_limit_store is None:
+            # Share limits across workers when Redis is configured; both stores
+            # are token buckets, so the rate limit headers mean the same thing
+            rate_limit_store = RedisRateLimitStore(settings.REDIS_URL) if settings.REDIS_URL else RateLimitStore()
+        self.rate_limit_store = rate_limit_store
         
         # Rate limit configurations (requests per minute)
         self.rate_limits = {
@@ -310,32 +397,21 @@ def sanitize_input(text: str, max_length: int = 10000) -> str:
     if not text:
         return ""
     
-    # Truncate to max length
+    # Truncate to max length before scanning
     text = text[:max_length]
     
-    # Remove dangerous patterns
-    dangerous_patterns = [
-        "<script",
-        "</script>",
-        "javascript:",
-        "data:text/html",
-        "vbscript:",
-        "onload=",
-        "onerror=",
-    ]
-    
-    for pattern in dangerous_patterns:
-        text = text.replace(pattern, "")
+    # Remove dangerous patterns, repeating until nothing changes so that
+    # patterns formed by a removal (e.g. "java<scriptscript:") are caught too
+    while True:
+        cleaned = _DANGEROUS_INPUT_RE.sub("", text)
+        if cleaned == text:
+            break
+        text = cleaned
     
     return text.strip()
 
 
 def validate_document_type(filename: str) -> bool:
     """Validate document type based on filename."""
-    allowed_extensions = {
-        ".pdf", ".txt", ".doc", ".docx", 
-        ".md", ".rtf", ".odt"
-    }
-    
-    filename_lower = filename.lower()
-    return any(filename_lower.endswith(ext) for ext in allowed_extensions)
\ No newline at end of file
+    _, dot, extension = filename.rpartition(".")
+    return bool(dot) and extension.lower() in _ALLOWED_DOCUMENT_EXTENSIONS
\ No newline at end of file
@@ -92,9 +92,11 @@ class RAGChunk(Document):
                 ("document_id", pymongo.ASCENDING),
                 ("chunk_index", pymongo.ASCENDING)
             ],
+            # Tenant-scoped chunk reads in document order
             [
                 ("user_id", pymongo.ASCENDING),
-                ("document_id", pymongo.ASCENDING)
+                ("document_id", pymongo.ASCENDING),
+                ("chunk_index", pymongo.ASCENDING)
             ],
             [("text_hash", pymongo.ASCENDING)],  # For deduplication
             [("qdrant_point_id", pymongo.ASCENDING)],
@@ -179,25 +181,28 @@ class RAGChunk(Document):
 
     def calculate_quality_metrics(self):
         """Calculate basic quality metrics for the chunk."""
-        # Simple readability based on sentence and word length
-        sentences = self.text.split('.')
-        words = self.text.split()
-        
-        if len(words) > 0:
-            avg_words_per_sentence = len(words) / max(len(sentences), 1)
-            avg_chars_per_word = len(self.text.replace(' ', '')) / len(words)
-            
+        # Simple readability based on sentence and word length.
+        # Each count is taken once so the text is only tokenized a single time.
+        text = self.text
+        sentences = text.split('.')
+        sentence_count = len(sentences)
+        word_count = len(text.split())
+
+        if word_count > 0:
+            avg_words_per_sentence = word_count / sentence_count
+            avg_chars_per_word = (len(text) - text.count(' ')) / word_count
+
             # Simple readability score (higher is more readable)
             self.readability_score = min(1.0, 1.0 / (1.0 + abs(avg_words_per_sentence - 15) / 10.0))
-            
+
             # Completeness based on presence of sentence endings
-            complete_sentences = len([s for s in sentences if s.strip()])
-            self.completeness_score = complete_sentences / max(len(sentences), 1)
-        
+            complete_sentences = sum(1 for s in sentences if s.strip())
+            self.completeness_score = complete_sentences / sentence_count
+
         # Overall processing quality (can be enhanced)
         quality_factors = [
-            1.0 if self.text.strip() else 0.0,  # Has content
-            1.0 if len(self.text.split()) >= 5 else 0.5,  # Minimum word count
+            1.0 if word_count > 0 else 0.0,  # Has content
+            1.0 if word_count >= 5 else 0.5,  # Minimum word count
             self.readability_score or 0.5,
             self.completeness_score or 0.5,
         ]
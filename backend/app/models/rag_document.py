@@ -115,6 +115,11 @@ class RAGDocument(Document):
                 ("status", pymongo.ASCENDING),
                 ("created_at", pymongo.DESCENDING)
             ],
+            # Unfiltered document listing, newest first
+            [
+                ("user_id", pymongo.ASCENDING),
+                ("created_at", pymongo.DESCENDING)
+            ],
             [("file_hash", pymongo.ASCENDING)],  # For deduplication
             [("processing_job_id", pymongo.ASCENDING)],
             [("gcs_path", pymongo.ASCENDING)],
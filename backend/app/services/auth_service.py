@@ -1,31 +1,61 @@
 import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
-from passlib.context import CryptContext
+import bcrypt
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 
 from app.config.settings import settings
 from app.models.user import User
 
+# Upper bound on cached decoded tokens; oldest entries are evicted first
+TOKEN_CACHE_MAX_SIZE = 4096
+
+# bcrypt only uses the first 72 bytes of a password (passlib truncated silently too)
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+# New hashes use Argon2id; legacy bcrypt hashes are verified and upgraded on login
+ARGON2_HASH_PREFIX = "$argon2id$"
+
 
 class AuthService:
     """Service for handling authentication operations."""
     
     def __init__(self):
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
         self.secret_key = settings.SECRET_KEY
         self.algorithm = settings.ALGORITHM
         self.access_token_expire_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        self._token_cache: Dict[str, Dict[str, Any]] = {}
     
     # Password operations
     def get_password_hash(self, password: str) -> str:
-        """Hash a plain password."""
-        return self.pwd_context.hash(password)
+        """Hash a plain password with Argon2id."""
+        return self.password_hasher.hash(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify a password against its hash."""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        """Verify a password against its Argon2id or legacy bcrypt hash."""
+        if hashed_password.startswith("$2"):
+            password_bytes = plain_password.encode("utf-8")[:BCRYPT_MAX_PASSWORD_BYTES]
+            try:
+                return bcrypt.checkpw(password_bytes, hashed_password.encode("ascii"))
+            except ValueError:
+                # Malformed bcrypt hash
+                return False
+        
+        try:
+            return self.password_hasher.verify(hashed_password, plain_password)
+        except (VerificationError, InvalidHashError):
+            return False
+    
+    def password_needs_rehash(self, hashed_password: str) -> bool:
+        """Check whether a stored hash should be replaced with a current Argon2id hash."""
+        if not hashed_password.startswith(ARGON2_HASH_PREFIX):
+            return True
+        return self.password_hasher.check_needs_rehash(hashed_password)
     
     # JWT operations
     def create_access_token(self, data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -42,29 +72,48 @@ class AuthService:
         return encoded_jwt
     
     def decode_access_token(self, token: str) -> Dict[str, Any]:
-        """Decode and validate a JWT token."""
+        """Decode and validate a JWT token (valid tokens are cached until exp)."""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            if cached["exp"] > time.time():
+                return dict(cached)
+            del self._token_cache[token]
+        
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            return payload
         except JWTError as e:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             ) from e
+        
+        # Only tokens that passed validation and carry an expiry are cached
+        if isinstance(payload.get("exp"), (int, float)):
+            if len(self._token_cache) >= TOKEN_CACHE_MAX_SIZE:
+                del self._token_cache[next(iter(self._token_cache))]
+            self._token_cache[token] = dict(payload)
+        return payload
+    
+    def clear_token_cache(self) -> None:
+        """Drop all cached decoded tokens."""
+        self._token_cache.clear()
     
     # User authentication
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate a user with email and password."""
         user = await User.find_one(User.email == email)
-        if not user:
+        
+        # Reject missing and inactive users before paying for a password check
+        if not user or not user.is_active:
             return None
         
         if not self.verify_password(password, user.hashed_password):
             return None
         
-        if not user.is_active:
-            return None
+        # Upgrade legacy bcrypt (or outdated Argon2) hashes; saved with last login
+        if self.password_needs_rehash(user.hashed_password):
+            user.hashed_password = self.get_password_hash(password)
         
         # Update last login
         user.update_last_login()
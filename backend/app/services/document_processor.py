@@ -3,9 +3,14 @@ Document Processing Service
 Handles parsing, chunking, and preprocessing of documents for RAG.
 """
 
+import asyncio
+import codecs
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Dict, Any, Optional, Union, BinaryIO
 from pathlib import Path
 import re
 
@@ -16,6 +21,21 @@ from ..config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Control bytes that should not appear in plain text (everything below 0x20
+# except tab, newline and carriage return, plus DEL).
+_TEXT_CONTROL_BYTES = bytes(b for b in range(0x20) if b not in (0x09, 0x0A, 0x0D)) + b"\x7f"
+# Maximum fraction of control bytes tolerated before a text file is rejected
+_MAX_CONTROL_BYTE_RATIO = 0.01
+# UTF-16/32 text carries a zero byte per ASCII character, so files declaring
+# one of these encodings with a BOM are exempt from the control-byte check
+_WIDE_TEXT_BOMS = (codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+
+# Precompiled patterns used by clean_text/create_chunks
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s\.,!?;:()\-\'""]')
+_NEWLINES_RE = re.compile(r'\n+')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+
 
 class DocumentProcessor:
     """Document processing and chunking service."""
@@ -140,13 +160,13 @@ class DocumentProcessor:
     def clean_text(self, text: str) -> str:
         """Clean and preprocess text content."""
         # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # Remove special characters but keep basic punctuation
-        text = re.sub(r'[^\w\s\.,!?;:()\-\'""]', ' ', text)
+        text = _SPECIAL_CHARS_RE.sub(' ', text)
         
         # Remove excessive newlines
-        text = re.sub(r'\n+', '\n', text)
+        text = _NEWLINES_RE.sub('\n', text)
         
         return text.strip()
     
@@ -162,84 +182,91 @@ class DocumentProcessor:
                 continue
             
             # Split into sentences for better chunking
-            sentences = re.split(r'(?<=[.!?])\s+', text)
+            sentences = _SENTENCE_SPLIT_RE.split(text)
             
-            current_chunk = ""
+            # Track the joined length instead of rebuilding the chunk string for
+            # every sentence; the text is only joined once per emitted chunk.
             current_chunk_sentences = []
+            current_length = 0
             
             for sentence in sentences:
                 # Check if adding this sentence would exceed chunk size
-                if len(current_chunk + " " + sentence) > self.chunk_size and current_chunk:
+                if current_chunk_sentences and current_length + 1 + len(sentence) > self.chunk_size:
                     # Save current chunk
-                    chunk_text = current_chunk.strip()
+                    chunk_text = " ".join(current_chunk_sentences).strip()
                     if chunk_text:
-                        chunks.append({
-                            "text": chunk_text,
-                            "text_hash": self.generate_text_hash(chunk_text),
-                            "page": page_num,
-                            "sentence_count": len(current_chunk_sentences),
-                            "char_count": len(chunk_text),
-                            "word_count": len(chunk_text.split())
-                        })
+                        chunks.append(self._build_chunk(chunk_text, page_num, len(current_chunk_sentences)))
                     
                     # Start new chunk with overlap
-                    if self.chunk_overlap > 0 and current_chunk_sentences:
-                        overlap_sentences = current_chunk_sentences[-min(2, len(current_chunk_sentences)):]
-                        current_chunk = " ".join(overlap_sentences)
-                        current_chunk_sentences = overlap_sentences[:]
+                    if self.chunk_overlap > 0:
+                        current_chunk_sentences = current_chunk_sentences[-2:]
+                        current_length = len(" ".join(current_chunk_sentences))
                     else:
-                        current_chunk = ""
                         current_chunk_sentences = []
+                        current_length = 0
                 
                 # Add current sentence
-                if current_chunk:
-                    current_chunk += " " + sentence
-                else:
-                    current_chunk = sentence
+                if current_chunk_sentences:
+                    current_length += 1
+                current_length += len(sentence)
                 current_chunk_sentences.append(sentence)
             
             # Add final chunk if there's remaining content
-            if current_chunk.strip():
-                chunk_text = current_chunk.strip()
-                chunks.append({
-                    "text": chunk_text,
-                    "text_hash": self.generate_text_hash(chunk_text),
-                    "page": page_num,
-                    "sentence_count": len(current_chunk_sentences),
-                    "char_count": len(chunk_text),
-                    "word_count": len(chunk_text.split())
-                })
+            chunk_text = " ".join(current_chunk_sentences).strip()
+            if chunk_text:
+                chunks.append(self._build_chunk(chunk_text, page_num, len(current_chunk_sentences)))
         
         logger.info(f"Created {len(chunks)} chunks from document")
         return chunks
     
+    def _build_chunk(self, chunk_text: str, page_num: int, sentence_count: int) -> Dict[str, Any]:
+        """Build the chunk dictionary for a finalized chunk of text."""
+        return {
+            "text": chunk_text,
+            "text_hash": self.generate_text_hash(chunk_text),
+            "page": page_num,
+            "sentence_count": sentence_count,
+            "char_count": len(chunk_text),
+            "word_count": len(chunk_text.split())
+        }
+    
     def generate_text_hash(self, text: str) -> str:
         """Generate SHA256 hash for text content."""
         return hashlib.sha256(text.encode('utf-8')).hexdigest()
     
-    def generate_document_hash(self, file_content: bytes) -> str:
-        """Generate SHA256 hash for document content."""
-        return hashlib.sha256(file_content).hexdigest()
+    def generate_document_hash(self, file_content: Union[bytes, BinaryIO]) -> str:
+        """Generate SHA256 hash for document content.
+
+        Accepts either the raw bytes or a binary file object; file objects are
+        streamed through hashlib.file_digest so they never need to be read fully
+        into memory.
+        """
+        if isinstance(file_content, (bytes, bytearray, memoryview)):
+            return hashlib.sha256(file_content).hexdigest()
+        return hashlib.file_digest(file_content, "sha256").hexdigest()
     
-    def validate_document(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+    def validate_document(self, file_content: bytes, filename: str, size: Optional[int] = None) -> Dict[str, Any]:
         """Validate document size and format."""
         max_size = 50 * 1024 * 1024  # 50MB
+        # Callers that already know the size (e.g. streamed uploads) may pass
+        # it explicitly along with only a prefix of the content
+        file_size = len(file_content) if size is None else size
         
         validation_result = {
             "valid": True,
             "errors": [],
             "warnings": [],
-            "file_size": len(file_content),
+            "file_size": file_size,
             "filename": filename
         }
         
         # Check file size
-        if len(file_content) > max_size:
+        if file_size > max_size:
             validation_result["valid"] = False
-            validation_result["errors"].append(f"File size ({len(file_content)} bytes) exceeds maximum allowed size ({max_size} bytes)")
+            validation_result["errors"].append(f"File size ({file_size} bytes) exceeds maximum allowed size ({max_size} bytes)")
         
         # Check if file is empty
-        if len(file_content) == 0:
+        if file_size == 0:
             validation_result["valid"] = False
             validation_result["errors"].append("File is empty")
         
@@ -254,40 +281,55 @@ class DocumentProcessor:
             validation_result["valid"] = False
             validation_result["errors"].append(f"Unsupported file type. Supported: {', '.join(supported_extensions)}")
         
+        # Check plain text files for binary content
+        if (
+            file_content
+            and filename.lower().endswith(('.txt', '.md'))
+            and not file_content.startswith(_WIDE_TEXT_BOMS)
+        ):
+            # translate() deletes the control bytes in a single C-level pass
+            control_bytes = len(file_content) - len(file_content.translate(None, _TEXT_CONTROL_BYTES))
+            if control_bytes / len(file_content) > _MAX_CONTROL_BYTE_RATIO:
+                validation_result["valid"] = False
+                validation_result["errors"].append("File contains binary data and is not valid text")
+        
         return validation_result
     
-    def extract_document_metadata(self, file_content: bytes, filename: str) -> Dict[str, Any]:
-        """Extract comprehensive document metadata."""
+    def extract_document_metadata(
+        self,
+        file_content: bytes,
+        filename: str,
+        file_hash: Optional[str] = None,
+        document_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Extract comprehensive document metadata.
+
+        Callers that already hashed the content can pass file_hash to skip a
+        second pass over the bytes, and callers that already parsed it can
+        pass the process_document result as document_data.
+        """
         metadata = {
             'filename': filename,
             'file_size': len(file_content),
-            'file_hash': self.generate_document_hash(file_content),
+            'file_hash': file_hash or self.generate_document_hash(file_content),
         }
         
         # Detect file type
-        file_ext = Path(filename).suffix.lower()
-        if file_ext in ['.pdf']:
-            metadata['file_type'] = 'PDF'
-        elif file_ext in ['.doc', '.docx']:
-            metadata['file_type'] = 'DOCX'
-        elif file_ext in ['.txt']:
-            metadata['file_type'] = 'TXT'
-        elif file_ext in ['.md']:
-            metadata['file_type'] = 'MARKDOWN'
-        else:
-            metadata['file_type'] = 'UNKNOWN'
+        metadata['file_type'] = self.detect_file_type(filename)
         
         try:
             # Process document to get additional metadata
-            document_data = self.process_document(file_content, filename, metadata['file_type'])
+            if document_data is None:
+                document_data = self.process_document(file_content, filename, metadata['file_type'])
             if 'metadata' in document_data:
                 metadata.update(document_data['metadata'])
                 
-            # Add text content length info
+            # Add text content length info, summed per page rather than over a
+            # joined copy of the whole document
             if 'text_content' in document_data:
-                total_text = ' '.join([content['text'] for content in document_data['text_content']])
-                metadata['total_words'] = len(total_text.split())
-                metadata['total_chars'] = len(total_text)
+                texts = [content['text'] for content in document_data['text_content']]
+                metadata['total_words'] = sum(len(text.split()) for text in texts)
+                metadata['total_chars'] = sum(map(len, texts)) + max(len(texts) - 1, 0)
                 
         except Exception as e:
             logger.error(f"Failed to extract extended metadata: {str(e)}")
@@ -295,34 +337,64 @@ class DocumentProcessor:
         
         return metadata
     
-    async def process_document_async(self, file_content: bytes, filename: str, user_id: str) -> Dict[str, Any]:
-        """Async wrapper for document processing with full workflow."""
-        try:
-            # Validate document
-            validation = self.validate_document(file_content, filename)
-            if not validation['valid']:
-                return {
-                    'success': False,
-                    'error': 'Validation failed',
-                    'validation_errors': validation['errors']
-                }
-            
-            # Extract metadata
-            metadata = self.extract_document_metadata(file_content, filename)
-            
-            # Process document content
-            document_data = self.process_document(file_content, filename, metadata['file_type'])
-            
-            # Create chunks
-            chunks = self.create_chunks(document_data['text_content'])
-            
+    def detect_file_type(self, filename: str) -> str:
+        """Map a filename's extension to the metadata file type."""
+        file_ext = Path(filename).suffix.lower()
+        if file_ext in ['.pdf']:
+            return 'PDF'
+        elif file_ext in ['.doc', '.docx']:
+            return 'DOCX'
+        elif file_ext in ['.txt']:
+            return 'TXT'
+        elif file_ext in ['.md']:
+            return 'MARKDOWN'
+        return 'UNKNOWN'
+    
+    def process_document_full(self, file_content: bytes, filename: str) -> Dict[str, Any]:
+        """Validate, extract and chunk a document synchronously."""
+        # Validate document
+        validation = self.validate_document(file_content, filename)
+        if not validation['valid']:
             return {
-                'success': True,
-                'metadata': metadata,
-                'text_content': document_data['text_content'],
-                'chunks': chunks,
-                'validation': validation
+                'success': False,
+                'error': 'Validation failed',
+                'validation_errors': validation['errors']
             }
+        
+        # Process document content once and derive the metadata from it
+        document_data = self.process_document(file_content, filename, self.detect_file_type(filename))
+        metadata = self.extract_document_metadata(file_content, filename, document_data=document_data)
+        
+        # Create chunks
+        chunks = self.create_chunks(document_data['text_content'])
+        
+        return {
+            'success': True,
+            'metadata': metadata,
+            'text_content': document_data['text_content'],
+            'chunks': chunks,
+            'validation': validation
+        }
+    
+    async def process_document_async(self, file_content: bytes, filename: str, user_id: str) -> Dict[str, Any]:
+        """Async wrapper for document processing with full workflow.
+
+        Parsing, chunking and chunk hashing are CPU-bound, so they run in a
+        worker process to keep the event loop free for concurrent I/O.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(
+                    _get_process_pool(), _process_document_in_worker, file_content, filename
+                )
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a malformed PDF); replace the pool and retry once
+                logger.warning(f"Document processing pool broke while processing {filename}, restarting it")
+                _reset_process_pool()
+                return await loop.run_in_executor(
+                    _get_process_pool(), _process_document_in_worker, file_content, filename
+                )
             
         except Exception as e:
             logger.error(f"Document processing failed for {filename}: {str(e)}")
@@ -332,5 +404,42 @@ class DocumentProcessor:
             }
 
 
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Create the shared document processing pool on first use."""
+    global _process_pool
+    if _process_pool is None:
+        # Spawn rather than fork: the server process already runs driver threads.
+        # Size explicitly; the default of os.cpu_count() applies per server worker
+        _process_pool = ProcessPoolExecutor(
+            max_workers=settings.DOCUMENT_PROCESS_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _process_pool
+
+
+def _reset_process_pool() -> None:
+    """Discard a broken pool so the next call creates a fresh one."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def shutdown_process_pool() -> None:
+    """Shut down the document processing pool, if it was started."""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+
+
+def _process_document_in_worker(file_content: bytes, filename: str) -> Dict[str, Any]:
+    """Entry point for processing a document inside a pool worker."""
+    return document_processor.process_document_full(file_content, filename)
+
+
 # Global document processor instance
 document_processor = DocumentProcessor()
\ No newline at end of file
@@ -5,18 +5,32 @@ Handles GCP authentication and Google Cloud Storage operations.
 
 import os
 import json
+import asyncio
 import logging
-from typing import Optional, Dict, Any, BinaryIO
+import threading
+from typing import Optional, Dict, Any, BinaryIO, Union
 from datetime import datetime, timedelta
 from google.cloud import storage
 from google.auth.exceptions import DefaultCredentialsError
-from google.api_core.exceptions import GoogleAPIError
+from google.api_core.exceptions import GoogleAPIError, NotFound
 import tempfile
 
 from app.config.settings import settings
 
 logger = logging.getLogger(__name__)
 
+# Payloads up to this size go up in a single multipart request; larger ones
+# use a resumable upload sent in chunks of GCS_UPLOAD_CHUNK_SIZE
+GCS_SINGLE_REQUEST_MAX_BYTES = 8 * 1024 * 1024
+GCS_UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Payloads above this size are split into parts that upload in parallel and
+# are composed server-side into the final object
+GCS_COMPOSITE_THRESHOLD_BYTES = 32 * 1024 * 1024
+GCS_COMPOSITE_PART_SIZE = 8 * 1024 * 1024
+GCS_COMPOSE_MAX_SOURCES = 32  # GCS limit per compose request
+GCS_COMPOSITE_MAX_PARALLEL = 8
+
 
 class GCPService:
     """Service for Google Cloud Platform operations."""
@@ -34,6 +48,11 @@ class GCPService:
     
     async def initialize(self):
         """Initialize GCP client with authentication."""
+        # The client is process-wide; repeat calls reuse it instead of redoing
+        # credential loading, the token fetch and the bucket check
+        if self.is_initialized():
+            return True
+        
         try:
             # Set credentials if provided
             if self.credentials_json:
@@ -55,14 +74,15 @@ class GCPService:
                 # Try to use default credentials (ADC)
                 logger.info("Using default GCP credentials (Application Default Credentials)")
             
-            # Initialize storage client
-            self._storage_client = storage.Client(project=self.project_id)
+            # Initialize storage client. Credential discovery and the bucket
+            # check below block on the network, so keep them off the event loop.
+            self._storage_client = await asyncio.to_thread(storage.Client, project=self.project_id)
             
             # Get bucket
             if self.bucket_name:
                 self._bucket = self._storage_client.bucket(self.bucket_name)
                 # Test bucket access
-                if not self._bucket.exists():
+                if not await asyncio.to_thread(self._bucket.exists):
                     logger.error(f"GCP bucket '{self.bucket_name}' does not exist")
                     return False
                 logger.info(f"Connected to GCP bucket: {self.bucket_name}")
@@ -98,8 +118,9 @@ class GCPService:
         user_id: str, 
         file_id: str, 
         filename: str, 
-        file_content: bytes,
-        content_type: Optional[str] = None
+        file_content: Union[bytes, BinaryIO],
+        content_type: Optional[str] = None,
+        size: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Upload file to Google Cloud Storage.
@@ -108,8 +129,10 @@ class GCPService:
             user_id: User identifier for multi-tenant storage
             file_id: Unique file identifier 
             filename: Original filename
-            file_content: File content as bytes
+            file_content: File content as bytes, or a seekable binary file to
+                stream from (it is rewound before uploading)
             content_type: MIME type of the file
+            size: Content length; computed when omitted
         
         Returns:
             Dict with upload result information
@@ -131,11 +154,54 @@ class GCPService:
                 'uploaded_by': 'rag_system'
             }
             
-            # Upload file with explicit content type
-            blob.upload_from_string(
-                file_content,
-                content_type=content_type if content_type else 'application/octet-stream'
-            )
+            # The storage client only accepts bytes; normalize other buffers once
+            # so every upload path below sees either bytes or a file object
+            if isinstance(file_content, (bytearray, memoryview)):
+                file_content = bytes(file_content)
+            is_bytes = isinstance(file_content, bytes)
+            if size is None:
+                if is_bytes:
+                    size = len(file_content)
+                else:
+                    size = file_content.seek(0, os.SEEK_END)
+            
+            # Small files skip the resumable session-init round trip
+            if size <= GCS_SINGLE_REQUEST_MAX_BYTES:
+                blob.chunk_size = None
+            else:
+                blob.chunk_size = GCS_UPLOAD_CHUNK_SIZE
+            
+            # Upload file with explicit content type. The blob path embeds a fresh
+            # file id, so if_generation_match=0 always holds and makes the upload
+            # safe for the client to retry. The CRC32C is computed by the C-backed
+            # google-crc32c package and checked by the server, so a corrupted
+            # transfer is rejected. The blocking call runs in a thread so
+            # concurrent uploads don't stall the event loop.
+            if size > GCS_COMPOSITE_THRESHOLD_BYTES:
+                await self._composite_upload(
+                    blob,
+                    file_content,
+                    size,
+                    content_type if content_type else 'application/octet-stream'
+                )
+            elif is_bytes:
+                await asyncio.to_thread(
+                    blob.upload_from_string,
+                    file_content,
+                    content_type=content_type if content_type else 'application/octet-stream',
+                    if_generation_match=0,
+                    checksum="crc32c"
+                )
+            else:
+                await asyncio.to_thread(
+                    blob.upload_from_file,
+                    file_content,
+                    size=size,
+                    rewind=True,
+                    content_type=content_type if content_type else 'application/octet-stream',
+                    if_generation_match=0,
+                    checksum="crc32c"
+                )
             
             logger.info(f"Successfully uploaded file to GCS: {blob_path}")
             
@@ -143,7 +209,7 @@ class GCPService:
                 'success': True,
                 'gcs_path': blob_path,
                 'blob_name': blob.name,
-                'size': len(file_content),
+                'size': size,
                 'content_type': content_type if content_type else 'application/octet-stream',
                 'upload_time': datetime.utcnow(),
                 'public_url': None  # We don't make files public by default
@@ -165,6 +231,59 @@ class GCPService:
                 'gcs_path': None
             }
     
+    async def _composite_upload(
+        self,
+        blob: storage.Blob,
+        file_content: Union[bytes, BinaryIO],
+        size: int,
+        content_type: str
+    ) -> None:
+        """Upload a large payload as parallel parts and compose them into blob."""
+        # Grow the part size if needed so a single compose request covers the file
+        part_size = max(GCS_COMPOSITE_PART_SIZE, -(-size // GCS_COMPOSE_MAX_SOURCES))
+        part_count = -(-size // part_size)
+        parts = [self._bucket.blob(f"{blob.name}.part-{index:02d}") for index in range(part_count)]
+        read_lock = threading.Lock()
+        semaphore = asyncio.Semaphore(GCS_COMPOSITE_MAX_PARALLEL)
+        
+        def upload_part(index: int):
+            offset = index * part_size
+            if isinstance(file_content, bytes):
+                data = file_content[offset:offset + part_size]
+            else:
+                # File objects share one position, so reads are serialized
+                with read_lock:
+                    file_content.seek(offset)
+                    data = file_content.read(part_size)
+            parts[index].upload_from_string(
+                data,
+                content_type=content_type,
+                if_generation_match=0,
+                checksum="crc32c"
+            )
+        
+        async def upload_bounded(index: int):
+            async with semaphore:
+                await asyncio.to_thread(upload_part, index)
+        
+        try:
+            # Let every part settle before cleanup so none is left behind
+            results = await asyncio.gather(
+                *(upload_bounded(index) for index in range(part_count)),
+                return_exceptions=True
+            )
+            for result in results:
+                if isinstance(result, BaseException):
+                    raise result
+            
+            blob.content_type = content_type
+            await asyncio.to_thread(blob.compose, parts, if_generation_match=0)
+        finally:
+            try:
+                await asyncio.to_thread(self._bucket.delete_blobs, parts, on_error=lambda part: None)
+            except GoogleAPIError as e:
+                logger.warning(f"Failed to clean up composite upload parts for {blob.name}: {str(e)}")
+    
     async def download_file(self, user_id: str, file_id: str, filename: str) -> Dict[str, Any]:
         """
         Download file from Google Cloud Storage.
@@ -185,17 +304,18 @@ class GCPService:
             blob_path = self._get_blob_path(user_id, file_id, filename)
             blob = self._bucket.blob(blob_path)
             
-            # Check if file exists
-            if not blob.exists():
+            # Download file content directly; a missing object surfaces as
+            # NotFound, which saves a separate existence check round trip.
+            # The blocking call runs in a thread to keep the event loop free.
+            try:
+                content = await asyncio.to_thread(blob.download_as_bytes)
+            except NotFound:
                 return {
                     'success': False,
                     'error': 'File not found',
                     'content': None
                 }
             
-            # Download file content
-            content = blob.download_as_bytes()
-            
             logger.info(f"Successfully downloaded file from GCS: {blob_path}")
             
             return {
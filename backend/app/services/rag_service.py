@@ -4,10 +4,12 @@ Handles document processing, embedding generation, and vector search.
 """
 
 import os
+import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from pathlib import Path
 
+import torch
 from qdrant_client import QdrantClient
 from qdrant_client.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
 from sentence_transformers import SentenceTransformer
@@ -27,14 +29,25 @@ class RAGService:
         self.embedding_model = None
         self.gcs_client = None
         self._initialized = False
+        self._init_lock = asyncio.Lock()
     
     async def initialize(self):
-        """Initialize RAG service connections and models."""
+        """Initialize RAG service connections and models (idempotent)."""
+        # Serialize concurrent callers so the embedding model is only loaded once
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self._initialize()
+    
+    async def _initialize(self):
+        """Create clients, load the embedding model and ensure the collection."""
         try:
             # Initialize Qdrant client
             self.qdrant_client = QdrantClient(
                 url=settings.QDRANT_URL,
-                api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None
+                api_key=settings.QDRANT_API_KEY if settings.QDRANT_API_KEY else None,
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC
             )
             
             # Initialize embedding model
@@ -63,7 +76,7 @@ class RAGService:
         """Ensure Qdrant collection exists with proper configuration."""
         try:
             collections = self.qdrant_client.get_collections().collections
-            collection_names = [col.name for col in collections]
+            collection_names = {col.name for col in collections}
             
             if settings.QDRANT_COLLECTION_NAME not in collection_names:
                 logger.info(f"Creating Qdrant collection: {settings.QDRANT_COLLECTION_NAME}")
@@ -89,12 +102,14 @@ class RAGService:
             raise RuntimeError("RAG service not initialized")
         
         try:
-            embeddings = self.embedding_model.encode(
-                texts,
-                batch_size=settings.EMBEDDING_BATCH_SIZE,
-                show_progress_bar=False,
-                convert_to_numpy=True
-            )
+            # inference_mode skips autograd version tracking on every forward pass
+            with torch.inference_mode():
+                embeddings = self.embedding_model.encode(
+                    texts,
+                    batch_size=settings.EMBEDDING_BATCH_SIZE,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                )
             return embeddings.tolist()
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {str(e)}")
@@ -111,15 +126,15 @@ class RAGService:
             raise RuntimeError("RAG service not initialized")
         
         try:
-            points = []
             texts = [chunk["text"] for chunk in chunks]
             
-            # Generate embeddings for all chunks
-            embeddings = self.generate_embeddings(texts)
+            # Embed all chunks in one batched encode call; run it (and the
+            # blocking upsert) in a worker thread so the event loop stays free
+            embeddings = await asyncio.to_thread(self.generate_embeddings, texts)
             
             # Create Qdrant points
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                point = PointStruct(
+            points = [
+                PointStruct(
                     id=f"{document_id}_{i}",
                     vector=embedding,
                     payload={
@@ -133,10 +148,12 @@ class RAGService:
                         "metadata": chunk.get("metadata", {})
                     }
                 )
-                points.append(point)
+                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+            ]
             
-            # Insert points into Qdrant
-            self.qdrant_client.upsert(
+            # Insert all points into Qdrant in a single upsert
+            await asyncio.to_thread(
+                self.qdrant_client.upsert,
                 collection_name=settings.QDRANT_COLLECTION_NAME,
                 points=points
             )
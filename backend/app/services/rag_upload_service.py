@@ -3,12 +3,16 @@ RAG Document Upload Service
 Handles document upload, storage, and registration without ML dependencies.
 """
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime
+from io import BytesIO
 from pathlib import Path
 from typing import Dict, Any, List, Optional
 from fastapi import UploadFile, BackgroundTasks
+from beanie import PydanticObjectId
+from pydantic import BaseModel, Field
 
 from app.models.rag_document import RAGDocument, DocumentStatus, DocumentType, DocumentMetadata
 from app.models.rag_chunk import RAGChunk, ChunkType, ChunkMetadata
@@ -20,6 +24,54 @@ from app.database import mongodb_manager
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of chunks written per insert_many call
+CHUNK_INSERT_BATCH_SIZE = 1000
+
+# Uploads larger than this are hashed on a worker thread; hashlib releases the
+# GIL while digesting, so large files don't stall the event loop
+HASH_OFFLOAD_THRESHOLD_BYTES = 1024 * 1024
+
+
+class _DocumentListItem(BaseModel):
+    """Projection of the fields returned when listing documents."""
+    id: PydanticObjectId = Field(alias="_id")
+    original_filename: str
+    file_type: DocumentType
+    file_size: int
+    status: DocumentStatus
+    gcs_path: Optional[str] = None
+    chunks_count: int = 0
+    embeddings_created: bool = False
+    created_at: datetime
+    updated_at: datetime
+    tags: List[str] = Field(default_factory=list)
+    category: Optional[str] = None
+    ai_summary: Optional[str] = None
+    ai_detailed_description: Optional[str] = None
+    ai_topics: List[str] = Field(default_factory=list)
+    ai_metadata_generated_at: Optional[datetime] = None
+    
+    class Settings:
+        # Processing metrics and the rest of the metadata are never sent back
+        projection = {
+            "_id": 1,
+            "original_filename": 1,
+            "file_type": 1,
+            "file_size": 1,
+            "status": 1,
+            "gcs_path": 1,
+            "chunks_count": 1,
+            "embeddings_created": 1,
+            "created_at": 1,
+            "updated_at": 1,
+            "tags": 1,
+            "category": 1,
+            "ai_summary": "$metadata.ai_summary",
+            "ai_detailed_description": "$metadata.ai_detailed_description",
+            "ai_topics": "$metadata.ai_topics",
+            "ai_metadata_generated_at": "$metadata.ai_metadata_generated_at",
+        }
+
 
 class RAGUploadService:
     """Service for handling RAG document uploads and registration."""
@@ -72,12 +124,19 @@ class RAGUploadService:
             raise Exception("RAG upload service not initialized")
         
         try:
-            # Read file content
-            file_content = await file.read()
+            # Read file content. In-memory uploads expose their buffer directly;
+            # UploadFile.read() would copy it on a threadpool hop.
+            if isinstance(getattr(file, 'file', None), BytesIO):
+                file_content = file.file.getvalue()
+            else:
+                file_content = await file.read()
             original_filename = file.filename or "unknown"
             
             # Generate file hash for deduplication
-            file_hash = document_processor.generate_document_hash(file_content)
+            if len(file_content) > HASH_OFFLOAD_THRESHOLD_BYTES:
+                file_hash = await asyncio.to_thread(document_processor.generate_document_hash, file_content)
+            else:
+                file_hash = document_processor.generate_document_hash(file_content)
             
             # Check for duplicate based on hash
             existing_doc = await RAGDocument.find_one(
@@ -94,8 +153,10 @@ class RAGUploadService:
             if not validation['valid']:
                 raise ValueError(f"Document validation failed: {', '.join(validation['errors'])}")
             
-            # Extract basic metadata
-            file_metadata = document_processor.extract_document_metadata(file_content, original_filename)
+            # Extract basic metadata, reusing the dedup hash instead of rehashing
+            file_metadata = document_processor.extract_document_metadata(
+                file_content, original_filename, file_hash=file_hash
+            )
             
             # Determine document type
             document_type = self._get_document_type(original_filename)
@@ -120,12 +181,16 @@ class RAGUploadService:
                 # Determine correct content type based on file extension
                 content_type = self._get_content_type(original_filename)
                 
+                # Stream from the upload's own file object when there is one
+                # instead of handing the in-memory copy to the GCS client
+                upload_source = file.file if getattr(file, 'file', None) is not None else file_content
                 upload_result = await gcp_service.upload_file(
                     user_id=user_id,
                     file_id=temp_file_id,
                     filename=original_filename,
-                    file_content=file_content,
-                    content_type=content_type
+                    file_content=upload_source,
+                    content_type=content_type,
+                    size=len(file_content)
                 )
                 
                 if upload_result['success']:
@@ -284,7 +349,7 @@ class RAGUploadService:
                 return
             
             # Create chunks in database
-            chunks_created = 0
+            chunks = []
             for chunk_idx, chunk_data in enumerate(processing_result['chunks']):
                 chunk = RAGChunk(
                     document_id=str(document.id),
@@ -304,8 +369,15 @@ class RAGUploadService:
                 
                 # Calculate quality metrics
                 chunk.calculate_quality_metrics()
-                await chunk.insert()
-                chunks_created += 1
+                chunks.append(chunk)
+            
+            # Write chunks in bulk rather than one round trip per chunk
+            for start in range(0, len(chunks), CHUNK_INSERT_BATCH_SIZE):
+                await RAGChunk.insert_many(
+                    chunks[start:start + CHUNK_INSERT_BATCH_SIZE],
+                    ordered=False
+                )
+            chunks_created = len(chunks)
             
             # Update document with AI metadata if available
             if ai_metadata:
@@ -408,13 +480,13 @@ class RAGUploadService:
             if status:
                 query = query & (RAGDocument.status == status)
             
-            # Get documents
-            documents = await RAGDocument.find(query).sort([
-                ("created_at", -1)
-            ]).skip(offset).limit(limit).to_list()
-            
-            # Count total
-            total_count = await RAGDocument.find(query).count()
+            # Get the requested page (projected to the listed fields) and the total count
+            documents, total_count = await asyncio.gather(
+                RAGDocument.find(query).sort([
+                    ("created_at", -1)
+                ]).skip(offset).limit(limit).project(_DocumentListItem).to_list(),
+                RAGDocument.find(query).count()
+            )
             
             # Convert to response format
             document_list = []
@@ -432,10 +504,10 @@ class RAGUploadService:
                     'tags': doc.tags,
                     'category': doc.category,
                     # AI-generated metadata
-                    'ai_summary': doc.metadata.ai_summary,
-                    'ai_detailed_description': doc.metadata.ai_detailed_description,
-                    'ai_topics': doc.metadata.ai_topics,
-                    'ai_metadata_generated_at': doc.metadata.ai_metadata_generated_at,
+                    'ai_summary': doc.ai_summary,
+                    'ai_detailed_description': doc.ai_detailed_description,
+                    'ai_topics': doc.ai_topics,
+                    'ai_metadata_generated_at': doc.ai_metadata_generated_at,
                     'can_download': doc.gcs_path is not None
                 })
             
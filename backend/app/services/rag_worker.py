@@ -5,6 +5,7 @@ Handles asynchronous document processing tasks using Redis Queue.
 
 import os
 import logging
+import time
 from typing import Dict, Any, Optional
 import asyncio
 
@@ -202,12 +203,23 @@ class RAGWorkerService:
     def get_queue_info(self) -> Dict[str, Any]:
         """Get information about the task queue."""
         try:
+            # Fetch all counters in a single round-trip instead of one per registry.
+            # Registry entries are scored by expiry time; count only unexpired ones,
+            # matching what registry.count reports after its cleanup pass.
+            now = f"({int(time.time())}"
+            pipe = self.redis_conn.pipeline(transaction=False)
+            pipe.llen(self.queue.key)
+            pipe.zcount(self.queue.started_job_registry.key, now, "+inf")
+            pipe.zcount(self.queue.finished_job_registry.key, now, "+inf")
+            pipe.zcount(self.queue.failed_job_registry.key, now, "+inf")
+            queued, started, finished, failed = pipe.execute()
+
             return {
                 "queue_name": self.queue.name,
-                "jobs_queued": len(self.queue),
-                "jobs_started": len(self.queue.started_job_registry),
-                "jobs_finished": len(self.queue.finished_job_registry),
-                "jobs_failed": len(self.queue.failed_job_registry)
+                "jobs_queued": queued,
+                "jobs_started": started,
+                "jobs_finished": finished,
+                "jobs_failed": failed
             }
             
         except Exception as e:
@@ -225,8 +237,11 @@ class RAGWorkerService:
                 name=f"rag-worker-{os.getpid()}"
             )
             
-            # Start worker (this blocks)
-            worker.work()
+            # Start worker (this blocks). Outside burst mode RQ dequeues with a
+            # blocking BLPOP across the queue keys, so an idle worker sleeps in
+            # Redis instead of polling; keep the scheduler loop off as no jobs
+            # are scheduled on this queue.
+            worker.work(burst=False, with_scheduler=False)
             
         except Exception as e:
             logger.error(f"Worker failed: {str(e)}")
@@ -30,7 +30,7 @@ async def create_test_user():
         print("Updated user to: active=True, verified=False")
     else:
         # Create new user
-        hashed_password = auth_service.pwd_context.hash(password)
+        hashed_password = auth_service.get_password_hash(password)
         new_user = User(
             email=email,
             hashed_password=hashed_password,
@@ -6,7 +6,7 @@ Fix test user password and verification status.
 import asyncio
 from app.models.user import User
 from app.database import mongodb_manager
-from passlib.context import CryptContext
+from app.services.auth_service import auth_service
 
 async def fix_test_user():
     # Initialize database connection
@@ -15,16 +15,13 @@ async def fix_test_user():
     email = "test@example.com"
     password = "TestPassword123!"
     
-    # Create password context
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    
     # Find user
     user = await User.find_one({"email": email})
     
     if user:
         print(f"Found user: {email}")
         # Update password and verification status
-        user.hashed_password = pwd_context.hash(password)
+        user.hashed_password = auth_service.get_password_hash(password)
         user.is_active = True
         user.is_verified = False  # Set to False for testing
         await user.save()
@@ -36,7 +33,7 @@ async def fix_test_user():
         # Create new user
         new_user = User(
             email=email,
-            hashed_password=pwd_context.hash(password),
+            hashed_password=auth_service.get_password_hash(password),
             is_active=True,
             is_verified=False
         )
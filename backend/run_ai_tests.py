@@ -0,0 +1,21 @@
+#!/usr/bin/env python3
+"""
+Run both AI test scripts on one event loop with a single service initialization.
+"""
+
+import asyncio
+from test_ai_direct import test_ai_direct
+from test_ai_metadata import initialize_services, test_ai_metadata_generation
+
+async def main():
+    """Initialize services once, then run the AI tests concurrently."""
+    print("🚀 Initializing services...")
+    await initialize_services()
+    
+    await asyncio.gather(
+        test_ai_direct(initialize=False),
+        test_ai_metadata_generation(initialize=False)
+    )
+
+if __name__ == "__main__":
+    asyncio.run(main())
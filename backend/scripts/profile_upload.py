@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Profile the upload test scripts with pyinstrument's async-aware sampler.
+See PROFILING.md for usage.
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    print("❌ pyinstrument is not installed (pip install -r requirements/dev.txt)")
+    sys.exit(1)
+
+from test_quick_upload import quick_test
+from test_upload_no_verification import test_upload
+
+def build_target(args):
+    """Return the coroutine for the selected upload script."""
+    if args.target == "quick":
+        return quick_test(count=args.count, concurrency=args.concurrency, quiet=args.count > 1)
+    return test_upload(args.file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile an upload test script")
+    parser.add_argument("target", choices=["quick", "no-verification"], help="Script to profile")
+    parser.add_argument("--output", type=Path, default=Path("profile.html"), help="HTML report path")
+    parser.add_argument("--count", type=int, default=1, help="Documents to upload (quick only)")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum concurrent uploads (quick only)")
+    parser.add_argument("--file", type=Path, help="File to upload (no-verification only)")
+    args = parser.parse_args()
+    
+    # async_mode="enabled" attributes time spent awaiting to the awaiting
+    # coroutine, so GCS, MongoDB and AI waits show up under their callers
+    with Profiler(async_mode="enabled") as profiler:
+        asyncio.run(build_target(args))
+    
+    args.output.write_text(profiler.output_html())
+    profiler.print()
+    print(f"\n📄 Profile written to {args.output}")
+
+if __name__ == "__main__":
+    main()
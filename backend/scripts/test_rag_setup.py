@@ -18,6 +18,16 @@ from app.services.document_processor import document_processor
 from app.services.rag_worker import rag_worker
 from app.config.settings import settings
 
+SAMPLE_TEXT = """
+        This is a sample legal document for testing purposes.
+        It contains multiple sentences and paragraphs to test chunking functionality.
+        
+        The document processor should be able to extract this text and create meaningful chunks.
+        Each chunk should be properly sized according to the configuration settings.
+        """
+# Encoded once and shared by validation and hashing
+SAMPLE_BYTES = SAMPLE_TEXT.encode('utf-8')
+
 
 async def test_rag_service_initialization():
     """Test RAG service initialization."""
@@ -45,7 +55,7 @@ async def test_qdrant_connectivity():
         print(f"✅ Connected to Qdrant, found {len(collections.collections)} collections")
         
         # Check if our collection exists
-        collection_names = [col.name for col in collections.collections]
+        collection_names = {col.name for col in collections.collections}
         if settings.QDRANT_COLLECTION_NAME in collection_names:
             print(f"✅ Collection '{settings.QDRANT_COLLECTION_NAME}' exists")
         else:
@@ -91,19 +101,10 @@ def test_document_processor():
     print("📄 Testing Document Processor...")
     
     try:
-        # Test with sample text
-        sample_text = """
-        This is a sample legal document for testing purposes.
-        It contains multiple sentences and paragraphs to test chunking functionality.
-        
-        The document processor should be able to extract this text and create meaningful chunks.
-        Each chunk should be properly sized according to the configuration settings.
-        """
-        
         # Test text extraction
         text_content = [{
             "page": 1,
-            "text": sample_text
+            "text": SAMPLE_TEXT
         }]
         
         # Test chunking
@@ -111,15 +112,17 @@ def test_document_processor():
         
         print(f"✅ Created {len(chunks)} chunks from sample text")
         
-        # Test validation
-        sample_bytes = sample_text.encode('utf-8')
-        validation = document_processor.validate_document(sample_bytes, "test.txt")
+        # Test validation and hashing on the same encoded buffer
+        validation = document_processor.validate_document(SAMPLE_BYTES, "test.txt")
         
         if validation["valid"]:
             print("✅ Document validation working")
         else:
             print(f"❌ Document validation failed: {validation['errors']}")
         
+        document_hash = document_processor.generate_document_hash(SAMPLE_BYTES)
+        print(f"✅ Document hash: {document_hash[:16]}...")
+        
         return len(chunks) > 0 and validation["valid"]
         
     except Exception as e:
@@ -248,7 +251,8 @@ async def main():
         if asyncio.iscoroutine(test_func):
             result = await test_func
         else:
-            result = test_func()
+            # CPU-bound checks (model inference, chunking) run off the event loop
+            result = await asyncio.to_thread(test_func)
         
         results.append((test_name, result))
     
@@ -295,15 +295,16 @@ async def test_qdrant_operations():
         
         # Test vector operations
         from qdrant_client.models import PointStruct
-        import random
+        import numpy as np
         
-        # Create test points
+        # Create test points (one vectorized draw, match embedding dimension)
+        rng = np.random.default_rng()
+        vectors = rng.random((3, 384), dtype=np.float32)
         test_points = []
-        for i in range(3):
-            vector = [random.random() for _ in range(384)]  # Match embedding dimension
+        for i, vector in enumerate(vectors):
             point = PointStruct(
                 id=f"test_point_{i}_stage2",
-                vector=vector,
+                vector=vector.tolist(),
                 payload={
                     "user_id": "test_user_stage2",
                     "document_id": "test_doc_id",
@@ -321,20 +322,21 @@ async def test_qdrant_operations():
             print("❌ Failed to upsert points")
             return False
         
-        # Test search
-        query_vector = [random.random() for _ in range(384)]
-        results = await qdrant_manager.search_similar(
-            query_vector=query_vector,
-            user_id="test_user_stage2",
-            limit=5
+        # Test search and user statistics concurrently (both are read-only)
+        query_vector = rng.random(384, dtype=np.float32).tolist()
+        results, user_stats = await asyncio.gather(
+            qdrant_manager.search_similar(
+                query_vector=query_vector,
+                user_id="test_user_stage2",
+                limit=5
+            ),
+            qdrant_manager.get_user_statistics("test_user_stage2")
         )
-        
+
         print(f"✅ Search returned {len(results)} results")
         if results:
             print(f"   Best match score: {results[0].score:.4f}")
-        
-        # Test user statistics
-        user_stats = await qdrant_manager.get_user_statistics("test_user_stage2")
+
         if "error" not in user_stats:
             print(f"✅ User statistics: {user_stats['points_count']} points")
         
@@ -399,26 +401,16 @@ async def cleanup_test_data():
     print("-" * 40)
     
     try:
-        # Delete test chunks
-        deleted_chunks = await RAGChunk.find(
-            RAGChunk.user_id == "test_user_stage2"
-        ).delete()
+        # Delete test chunks, documents, sessions and Qdrant points concurrently
+        deleted_chunks, deleted_docs, deleted_sessions, _ = await asyncio.gather(
+            RAGChunk.find(RAGChunk.user_id == "test_user_stage2").delete(),
+            RAGDocument.find(RAGDocument.user_id == "test_user_stage2").delete(),
+            RAGSession.find(RAGSession.user_id == "test_user_stage2").delete(),
+            qdrant_manager.delete_points_by_filter("test_user_stage2")
+        )
         print(f"✅ Deleted {deleted_chunks.deleted_count} test chunks")
-        
-        # Delete test documents
-        deleted_docs = await RAGDocument.find(
-            RAGDocument.user_id == "test_user_stage2"
-        ).delete()
         print(f"✅ Deleted {deleted_docs.deleted_count} test documents")
-        
-        # Delete test sessions
-        deleted_sessions = await RAGSession.find(
-            RAGSession.user_id == "test_user_stage2"
-        ).delete()
         print(f"✅ Deleted {deleted_sessions.deleted_count} test sessions")
-        
-        # Delete test points from Qdrant
-        await qdrant_manager.delete_points_by_filter("test_user_stage2")
         print("✅ Deleted test points from Qdrant")
         
         return True
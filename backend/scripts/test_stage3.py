@@ -7,12 +7,17 @@ Tests Authentication & Security functionality.
 import asyncio
 import sys
 import logging
-import requests
 import json
+import uuid
 from pathlib import Path
+from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+import httpx
+from argon2 import PasswordHasher
+from beanie.operators import In
+
 # Add the backend directory to Python path
 backend_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(backend_dir))
@@ -22,32 +27,36 @@ from app.models.user import User
 from app.services.auth_service import auth_service
 from app.services.gcp_service import gcp_service
 from app.database import mongodb_manager
-from app.middleware.rag_middleware import RateLimitStore
+from app.middleware.rag_middleware import RateLimitStore, RedisRateLimitStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
 class Stage3TestSuite:
     """Test suite for Stage 3: Authentication & Security."""
     
-    def __init__(self):
-        self.base_url = f"http://{settings.HOST}:{settings.PORT}"
-        self.test_user_email = "stage3_test@example.com"
-        self.test_password = "TestPassword123!"
-        self.test_user_id = None
-        self.test_token = None
+    base_url: str = field(default_factory=lambda: f"http://{settings.HOST}:{settings.PORT}")
+    test_user_email: str = "stage3_test@example.com"
+    test_password: str = "TestPassword123!"
+    test_user_id: Optional[str] = None
+    test_token: Optional[str] = None
+    
+    def __post_init__(self):
+        # Hashes made during the run only need to round-trip, not resist
+        # brute force: use the cheapest Argon2id parameters
+        auth_service.password_hasher = PasswordHasher(time_cost=1, memory_cost=8, parallelism=1)
     
     async def setup_test_user(self) -> bool:
         """Create a test user for authentication tests."""
         print("🔧 Setting up test user...")
         
         try:
-            # Delete existing test user if exists
-            existing_user = await User.find_one(User.email == self.test_user_email)
-            if existing_user:
-                await existing_user.delete()
+            # Delete existing test user if exists (single delete, no fetch)
+            deleted = await User.find(User.email == self.test_user_email).delete()
+            if deleted and deleted.deleted_count:
                 print("   Deleted existing test user")
             
             # Create new test user
@@ -94,9 +103,8 @@ class Stage3TestSuite:
             
             print(f"✅ User authenticated: {user.email}")
             
-            # Test token creation
-            token_data = {"sub": user.email}
-            token = auth_service.create_access_token(token_data)
+            # Reuse the token signed in setup_test_user for the same subject
+            token = self.test_token
             
             if not token:
                 print("❌ Token creation failed")
@@ -205,13 +213,16 @@ class Stage3TestSuite:
             limit = 5
             window = 60
             
-            # Make requests up to limit
+            # Make requests up to limit, buffering output into a single write
+            log = []
             for i in range(limit):
                 allowed, info = await rate_store.is_allowed(key, limit, window)
                 if not allowed:
-                    print(f"❌ Request {i+1} should be allowed")
+                    log.append(f"❌ Request {i+1} should be allowed")
+                    sys.stdout.write("\n".join(log) + "\n")
                     return False
-                print(f"✅ Request {i+1}: allowed, remaining: {info['remaining']}")
+                log.append(f"✅ Request {i+1}: allowed, remaining: {info['remaining']}")
+            sys.stdout.write("\n".join(log) + "\n")
             
             # Next request should be blocked
             blocked, info = await rate_store.is_allowed(key, limit, window)
@@ -236,14 +247,111 @@ class Stage3TestSuite:
             print(f"❌ Rate limiting test failed: {str(e)}")
             return False
     
-    def test_api_security_headers(self) -> bool:
+    async def test_redis_rate_limiting(self) -> bool:
+        """Test the Redis-backed rate limit store against a real Redis."""
+        print("\n⏱️  Testing Redis Rate Limiting")
+        print("-" * 40)
+        
+        redis_url = settings.REDIS_URL or settings.RQ_REDIS_URL
+        prefix = f"rl-test-{uuid.uuid4().hex}:"
+        rate_store = RedisRateLimitStore(redis_url, key_prefix=prefix)
+        # A second store stands in for another server worker
+        other_worker_store = RedisRateLimitStore(redis_url, key_prefix=prefix)
+        
+        try:
+            # The store silently falls back to memory, so check Redis is really there
+            try:
+                await rate_store.redis.ping()
+            except Exception as e:
+                print(f"❌ Redis not reachable at {redis_url}: {str(e)}")
+                return False
+            
+            key = "test_user_stage3"
+            limit = 5
+            window = 60
+            
+            for i in range(limit):
+                allowed, info = await rate_store.is_allowed(key, limit, window)
+                if not allowed or info["remaining"] != limit - i - 1:
+                    print(f"❌ Request {i+1} should be allowed with {limit - i - 1} remaining, got {info}")
+                    return False
+            
+            print(f"✅ {limit} requests allowed")
+            
+            # The bucket is shared, so another worker sees it exhausted
+            allowed, info = await other_worker_store.is_allowed(key, limit, window)
+            if allowed:
+                print("❌ Rate limit not shared across stores")
+                return False
+            
+            # One token refills every window / limit seconds
+            if info["remaining"] != 0 or not 0 < info["retry_after"] <= window // limit:
+                print(f"❌ Unexpected blocked rate limit info: {info}")
+                return False
+            
+            print(f"✅ Request blocked across workers: retry_after={info['retry_after']}")
+            
+            # Tokens refill continuously rather than at a window boundary
+            fast_key = "refill_stage3"
+            for _ in range(2):
+                await rate_store.is_allowed(fast_key, 2, 1)
+            allowed, _ = await rate_store.is_allowed(fast_key, 2, 1)
+            if allowed:
+                print("❌ Fast bucket should be exhausted")
+                return False
+            await asyncio.sleep(0.6)
+            allowed, _ = await rate_store.is_allowed(fast_key, 2, 1)
+            if not allowed:
+                print("❌ Token not refilled")
+                return False
+            
+            print("✅ Tokens refill continuously")
+            
+            # Requests are still limited in memory when Redis is unreachable
+            unreachable_store = RedisRateLimitStore("redis://127.0.0.1:1/0", key_prefix=prefix)
+            try:
+                results = [(await unreachable_store.is_allowed(key, 1, window))[0] for _ in range(2)]
+            finally:
+                await unreachable_store.redis.aclose()
+            if results != [True, False]:
+                print(f"❌ In-memory fallback not enforced: {results}")
+                return False
+            
+            print("✅ In-memory fallback used when Redis is unreachable")
+            
+            return True
+            
+        except Exception as e:
+            print(f"❌ Redis rate limiting test failed: {str(e)}")
+            return False
+        finally:
+            try:
+                keys = [key async for key in rate_store.redis.scan_iter(match=f"{prefix}*")]
+                if keys:
+                    await rate_store.redis.delete(*keys)
+            except Exception as e:
+                print(f"⚠️  Redis rate limit cleanup failed: {str(e)}")
+            await rate_store.redis.aclose()
+            await other_worker_store.redis.aclose()
+    
+    async def test_api_security_headers(self) -> bool:
         """Test API security headers and CORS."""
         print("\n🛡️  Testing API Security Headers")
         print("-" * 40)
         
         try:
-            # Test health endpoint (should work without auth)
-            response = requests.get(f"{self.base_url}/health", timeout=10)
+            # Health (no auth) and CORS preflight share one keep-alive client
+            async with httpx.AsyncClient(base_url=self.base_url, timeout=10) as client:
+                response, cors_response = await asyncio.gather(
+                    client.get("/health"),
+                    client.options(
+                        "/api/v1/rag/health",
+                        headers={
+                            "Origin": "http://localhost:3000",
+                            "Access-Control-Request-Method": "GET"
+                        }
+                    )
+                )
             
             if response.status_code != 200:
                 print(f"❌ Health endpoint failed: {response.status_code}")
@@ -251,16 +359,6 @@ class Stage3TestSuite:
             
             print("✅ Health endpoint accessible")
             
-            # Test CORS headers
-            cors_response = requests.options(
-                f"{self.base_url}/api/v1/rag/health",
-                headers={
-                    "Origin": "http://localhost:3000",
-                    "Access-Control-Request-Method": "GET"
-                },
-                timeout=10
-            )
-            
             # CORS should be configured
             if "access-control-allow-origin" not in cors_response.headers:
                 print("⚠️  CORS headers not found (may be expected)")
@@ -269,7 +367,7 @@ class Stage3TestSuite:
             
             return True
             
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print("⚠️  API server not running - skipping API tests")
             return True
         except Exception as e:
@@ -334,19 +432,16 @@ class Stage3TestSuite:
             password = "TestPassword123!"
             
             # Clean up existing users
-            for email in [user1_email, user2_email]:
-                existing = await User.find_one(User.email == email)
-                if existing:
-                    await existing.delete()
+            await User.find(In(User.email, [user1_email, user2_email])).delete()
             
-            # Create users
-            user1 = await auth_service.create_user(user1_email, password)
-            user2 = await auth_service.create_user(user2_email, password)
-            
-            user1.is_verified = True
-            user2.is_verified = True
-            await user1.save()
-            await user2.save()
+            # Hash both passwords off the event loop, then insert in one batch
+            hashed1, hashed2 = await asyncio.gather(
+                asyncio.to_thread(auth_service.get_password_hash, password),
+                asyncio.to_thread(auth_service.get_password_hash, password)
+            )
+            user1 = User(email=user1_email, hashed_password=hashed1, is_active=True, is_verified=True)
+            user2 = User(email=user2_email, hashed_password=hashed2, is_active=True, is_verified=True)
+            await User.insert_many([user1, user2])
             
             print(f"✅ Created test tenants: {user1_email}, {user2_email}")
             
@@ -372,8 +467,7 @@ class Stage3TestSuite:
             print("✅ Token isolation working correctly")
             
             # Cleanup test users
-            await user1.delete()
-            await user2.delete()
+            await User.find(In(User.email, [user1_email, user2_email])).delete()
             print("✅ Test tenant cleanup complete")
             
             return True
@@ -401,6 +495,20 @@ class Stage3TestSuite:
             
             print("✅ XSS input sanitized")
             
+            # Test patterns that only appear once a nested pattern is removed
+            nested_inputs = [
+                "<img onl<scriptoad=alert(1)>",
+                "java<scriptscript:alert(1)",
+                "<svg onerr</script>or=x>",
+            ]
+            for nested_input in nested_inputs:
+                sanitized_nested = sanitize_input(nested_input).lower()
+                if any(pattern in sanitized_nested for pattern in ("<script", "javascript:", "onload=", "onerror=")):
+                    print(f"❌ Nested XSS not prevented: {nested_input}")
+                    return False
+            
+            print("✅ Nested XSS input sanitized")
+            
             # Test length limiting
             long_input = "A" * 20000
             sanitized_long = sanitize_input(long_input, max_length=1000)
@@ -440,22 +548,17 @@ class Stage3TestSuite:
         print("\n🧹 Cleaning up test data...")
         
         try:
-            # Delete test user
-            test_user = await User.find_one(User.email == self.test_user_email)
-            if test_user:
-                await test_user.delete()
-                print("✅ Test user deleted")
-            
-            # Clean up any other test users
+            # Delete the test user and any tenant users in one round-trip
             test_emails = [
+                self.test_user_email,
                 "tenant1_stage3@example.com",
                 "tenant2_stage3@example.com"
             ]
             
-            for email in test_emails:
-                user = await User.find_one(User.email == email)
-                if user:
-                    await user.delete()
+            deleted = await User.find(In(User.email, test_emails)).delete()
+            print(f"✅ Deleted {deleted.deleted_count if deleted else 0} test users")
+            
+            auth_service.clear_token_cache()
             
             print("✅ Cleanup completed")
             return True
@@ -485,34 +588,48 @@ async def main():
         print("❌ Failed to setup test environment")
         return 1
     
-    tests = [
+    # Independent, I/O-bound tests overlap their Mongo/HTTP round-trips
+    parallel_tests = [
         ("JWT Authentication", test_suite.test_jwt_authentication()),
-        ("User Model Security", test_suite.test_user_model_security()),
         ("Rate Limiting", test_suite.test_rate_limiting()),
+        ("Redis Rate Limiting", test_suite.test_redis_rate_limiting()),
         ("API Security Headers", test_suite.test_api_security_headers()),
         ("GCP Authentication", test_suite.test_gcp_authentication()),
-        ("Multi-Tenant Security", test_suite.test_multi_tenant_security()),
         ("Input Validation", test_suite.test_input_validation()),
     ]
     
-    passed_tests = 0
-    total_tests = len(tests)
+    # These toggle the shared test user or create tenants, so they run
+    # one at a time after the parallel group.
+    sequential_tests = [
+        ("User Model Security", test_suite.test_user_model_security),
+        ("Multi-Tenant Security", test_suite.test_multi_tenant_security),
+    ]
     
-    for test_name, test_coro in tests:
+    total_tests = len(parallel_tests) + len(sequential_tests)
+    
+    print(f"\n🧪 Running {len(parallel_tests)} tests concurrently")
+    parallel_results = await asyncio.gather(
+        *(test_coro for _, test_coro in parallel_tests),
+        return_exceptions=True
+    )
+    results = list(zip((name for name, _ in parallel_tests), parallel_results))
+    
+    for test_name, test_func in sequential_tests:
         print(f"\n🧪 Running: {test_name}")
         try:
-            if asyncio.iscoroutine(test_coro):
-                result = await test_coro
-            else:
-                result = test_coro
-                
-            if result:
-                passed_tests += 1
-                print(f"✅ {test_name}: PASSED")
-            else:
-                print(f"❌ {test_name}: FAILED")
+            results.append((test_name, await test_func()))
         except Exception as e:
-            print(f"❌ {test_name}: ERROR - {str(e)}")
+            results.append((test_name, e))
+    
+    passed_tests = 0
+    for test_name, result in results:
+        if isinstance(result, Exception):
+            print(f"❌ {test_name}: ERROR - {str(result)}")
+        elif result:
+            passed_tests += 1
+            print(f"✅ {test_name}: PASSED")
+        else:
+            print(f"❌ {test_name}: FAILED")
     
     # Cleanup
     print("\n" + "=" * 60)
@@ -7,12 +7,13 @@ Tests Document Upload & Registration functionality.
 import asyncio
 import sys
 import logging
-import requests
-import json
+import os
 import io
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
+from pydantic import BaseModel
 
 # Add the backend directory to Python path
 backend_dir = Path(__file__).parent.parent
@@ -33,12 +34,29 @@ logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+class _DocStatus(BaseModel):
+    """Projection that loads only a document's processing status."""
+    status: DocumentStatus
+
+
+@lru_cache(maxsize=64)
+def _cached_access_token(email: str, secret_key: str, algorithm: str) -> str:
+    """Sign the access token for a test principal once per process.
+    
+    The signing key and algorithm are part of the cache key, so rotating
+    either produces a fresh token.
+    """
+    return auth_service.create_access_token({"sub": email})
+
+
 class Stage4TestSuite:
     """Test suite for Stage 4: Document Upload & Registration."""
     
     def __init__(self):
         self.base_url = f"http://{settings.HOST}:{settings.PORT}"
         self.test_user_email = "stage4_test@example.com"
+        # Built once and reused by every lookup of the test user
+        self._user_query = User.email == self.test_user_email
         self.test_password = "TestPassword123!"
         self.test_user_id = None
         self.test_token = None
@@ -49,10 +67,9 @@ class Stage4TestSuite:
         print("🔧 Setting up test user...")
         
         try:
-            # Delete existing test user if exists
-            existing_user = await User.find_one(User.email == self.test_user_email)
-            if existing_user:
-                await existing_user.delete()
+            # Delete existing test user if exists, without loading the document
+            result = await User.find_one(self._user_query).delete()
+            if result and result.deleted_count:
                 print("   Deleted existing test user")
             
             # Create new test user
@@ -69,9 +86,10 @@ class Stage4TestSuite:
             
             self.test_user_id = str(test_user.id)
             
-            # Create access token
-            token_data = {"sub": self.test_user_email}
-            self.test_token = auth_service.create_access_token(token_data)
+            # Create access token (memoized per process for the static test principal)
+            self.test_token = _cached_access_token(
+                self.test_user_email, auth_service.secret_key, auth_service.algorithm
+            )
             
             print(f"✅ Test user created: {self.test_user_email}")
             print(f"   User ID: {self.test_user_id}")
@@ -99,7 +117,8 @@ class Stage4TestSuite:
             print("✅ Document validation passed")
             
             # Test hash calculation
-            file_hash = document_processor.generate_document_hash(test_content)
+            # Hashing is CPU-bound (hashlib releases the GIL), keep it off the loop
+            file_hash = await asyncio.to_thread(document_processor.generate_document_hash, test_content)
             if not file_hash or len(file_hash) != 64:  # SHA256 is 64 chars hex
                 print("❌ Hash calculation failed")
                 return False
@@ -107,7 +126,7 @@ class Stage4TestSuite:
             print(f"✅ File hash calculated: {file_hash[:16]}...")
             
             # Test metadata extraction
-            metadata = document_processor.extract_document_metadata(test_content, "test.txt")
+            metadata = await asyncio.to_thread(document_processor.extract_document_metadata, test_content, "test.txt")
             if not metadata or metadata['filename'] != "test.txt":
                 print("❌ Metadata extraction failed")
                 return False
@@ -149,19 +168,19 @@ The system should be able to parse this content, create meaningful chunks, and s
 
 This document will be used to verify that the upload, processing, and storage workflow functions correctly."""
             
-            # Create a mock UploadFile
+            # Create a mock UploadFile backed by a buffer (UploadFile semantics)
             class MockUploadFile:
                 def __init__(self, content: bytes, filename: str, content_type: str = "text/plain"):
-                    self.content = content
+                    self.file = io.BytesIO(content)
                     self.filename = filename
                     self.content_type = content_type
-                    self._position = 0
+                    self.size = len(content)
                 
-                async def read(self) -> bytes:
-                    return self.content
+                async def read(self, size: int = -1) -> bytes:
+                    return self.file.read(size)
                 
                 async def seek(self, position: int):
-                    self._position = position
+                    self.file.seek(position)
             
             mock_file = MockUploadFile(test_content, "test_document.txt")
             
@@ -235,7 +254,7 @@ This document will be used to verify that the upload, processing, and storage wo
             except:
                 obj_id = document_id
             
-            document = await RAGDocument.find_one(RAGDocument.id == obj_id)
+            document = await RAGDocument.find_one(RAGDocument.id == obj_id).project(_DocStatus)
             if not document:
                 print("❌ Document not found in database")
                 return False
@@ -243,28 +262,40 @@ This document will be used to verify that the upload, processing, and storage wo
             print(f"✅ Document found: {document.status}")
             
             # Check if chunks were created
-            chunks = await RAGChunk.find(
+            chunk_count = await RAGChunk.find(
                 RAGChunk.document_id == document_id,
                 RAGChunk.user_id == self.test_user_id
-            ).to_list()
+            ).count()
             
-            if len(chunks) == 0:
+            if chunk_count == 0:
                 print("⚠️  No chunks created yet (processing may be in progress)")
                 return True  # Not a failure, just processing delay
             
-            print(f"✅ Chunks created: {len(chunks)} chunks")
-            
-            # Check chunk content
-            for i, chunk in enumerate(chunks[:3]):  # Check first 3 chunks
-                if not chunk.text or len(chunk.text.strip()) == 0:
+            print(f"✅ Chunks created: {chunk_count} chunks")
+            
+            # Check chunk content server-side; only the first 3 chunks' summary
+            # fields come back instead of full chunk documents
+            chunks = await RAGChunk.aggregate([
+                {"$match": {"document_id": document_id, "user_id": self.test_user_id}},
+                {"$limit": 3},
+                {"$project": {
+                    "_id": 0,
+                    "text_hash": 1,
+                    "text_len": {"$strLenCP": {"$ifNull": ["$text", ""]}},
+                    "text_empty": {"$eq": [{"$trim": {"input": {"$ifNull": ["$text", ""]}}}, ""]}
+                }}
+            ]).to_list()
+            
+            for i, chunk in enumerate(chunks):
+                if chunk["text_empty"]:
                     print(f"❌ Chunk {i} has empty text")
                     return False
                 
-                if not chunk.text_hash:
+                if not chunk.get("text_hash"):
                     print(f"❌ Chunk {i} missing text hash")
                     return False
                 
-                print(f"✅ Chunk {i}: {len(chunk.text)} chars, hash: {chunk.text_hash[:8]}...")
+                print(f"✅ Chunk {i}: {chunk['text_len']} chars, hash: {chunk['text_hash'][:8]}...")
             
             return True
             
@@ -358,15 +389,20 @@ This document will be used to verify that the upload, processing, and storage wo
             print(f"✅ Document deleted: {result['deleted_document_id']}")
             print(f"   Deleted chunks: {result['deleted_chunks']}")
             
-            # Verify deletion
-            document = await RAGDocument.find_one(RAGDocument.id == document_id)
-            if document:
+            # Verify deletion with existence checks; no document needs to be loaded
+            from beanie import PydanticObjectId
+            try:
+                obj_id = PydanticObjectId(document_id)
+            except:
+                obj_id = document_id
+            
+            if await RAGDocument.get_motor_collection().count_documents({"_id": obj_id}, limit=1):
                 print("❌ Document still exists after deletion")
                 return False
             
-            chunks = await RAGChunk.find(RAGChunk.document_id == document_id).to_list()
-            if chunks:
-                print(f"❌ {len(chunks)} chunks still exist after deletion")
+            chunk_count = await RAGChunk.find(RAGChunk.document_id == document_id).count()
+            if chunk_count:
+                print(f"❌ {chunk_count} chunks still exist after deletion")
                 return False
             
             print("✅ Document and chunks successfully removed")
@@ -400,10 +436,9 @@ This document will be used to verify that the upload, processing, and storage wo
                 return False
             print("✅ Unsupported file type correctly rejected")
             
-            # Test oversized file (simulate with check)
+            # Test oversized file (declared size, no 50MB allocation)
             max_size = 50 * 1024 * 1024  # 50MB
-            oversized_content = b"x" * (max_size + 1)
-            oversized_validation = document_processor.validate_document(oversized_content, "large.txt")
+            oversized_validation = document_processor.validate_document(b"x", "large.txt", size=max_size + 1)
             if oversized_validation['valid']:
                 print("❌ Oversized file should be rejected")
                 return False
@@ -428,22 +463,32 @@ This document will be used to verify that the upload, processing, and storage wo
         print("\n🧹 Cleaning up test data...")
         
         try:
-            # Delete any remaining uploaded documents
-            for doc_id in self.uploaded_doc_ids[:]:
-                try:
-                    result = await rag_upload_service.delete_document(doc_id, self.test_user_id)
-                    if result['success']:
-                        print(f"✅ Deleted document {doc_id}")
-                        self.uploaded_doc_ids.remove(doc_id)
-                    else:
-                        print(f"⚠️  Failed to delete document {doc_id}: {result.get('error')}")
-                except Exception as e:
-                    print(f"⚠️  Error deleting document {doc_id}: {str(e)}")
+            # Delete any remaining uploaded documents concurrently, capped so
+            # the Mongo/GCS deletes don't all land at once
+            semaphore = asyncio.Semaphore(8)
+            
+            async def delete_one(doc_id: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await rag_upload_service.delete_document(doc_id, self.test_user_id)
+            
+            doc_ids = list(self.uploaded_doc_ids)
+            results = await asyncio.gather(
+                *(delete_one(doc_id) for doc_id in doc_ids),
+                return_exceptions=True
+            )
+            
+            for doc_id, result in zip(doc_ids, results):
+                if isinstance(result, Exception):
+                    print(f"⚠️  Error deleting document {doc_id}: {str(result)}")
+                elif result['success']:
+                    print(f"✅ Deleted document {doc_id}")
+                    self.uploaded_doc_ids.remove(doc_id)
+                else:
+                    print(f"⚠️  Failed to delete document {doc_id}: {result.get('error')}")
             
             # Delete test user
-            test_user = await User.find_one(User.email == self.test_user_email)
-            if test_user:
-                await test_user.delete()
+            result = await User.find_one(self._user_query).delete()
+            if result and result.deleted_count:
                 print("✅ Test user deleted")
             
             print("✅ Cleanup completed")
@@ -486,30 +531,44 @@ async def main():
         print("❌ Failed to setup test environment")
         return 1
     
-    tests = [
-        ("Document Processor", test_suite.test_document_processor()),
-        ("File Validation", test_suite.test_file_validation()),
-        ("Upload Service", test_suite.test_upload_service()),
-        ("Background Processing", test_suite.test_background_processing()),
-        ("GCS Integration", test_suite.test_gcs_integration()),
-        ("User Statistics", test_suite.test_user_statistics()),
-        ("Document Deletion", test_suite.test_document_deletion()),
+    # Tests run in dependency tiers; tests within a tier are independent
+    # and overlap their Mongo/GCS round-trips. Tier C only reads
+    # uploaded_doc_ids, which tier D later mutates.
+    test_tiers = [
+        [
+            ("Document Processor", test_suite.test_document_processor),
+            ("File Validation", test_suite.test_file_validation),
+        ],
+        [
+            ("Upload Service", test_suite.test_upload_service),
+        ],
+        [
+            ("Background Processing", test_suite.test_background_processing),
+            ("GCS Integration", test_suite.test_gcs_integration),
+            ("User Statistics", test_suite.test_user_statistics),
+        ],
+        [
+            ("Document Deletion", test_suite.test_document_deletion),
+        ],
     ]
     
     passed_tests = 0
-    total_tests = len(tests)
+    total_tests = sum(len(tier) for tier in test_tiers)
     
-    for test_name, test_coro in tests:
-        print(f"\n🧪 Running: {test_name}")
-        try:
-            result = await test_coro
-            if result:
+    for tier in test_tiers:
+        print(f"\n🧪 Running: {', '.join(name for name, _ in tier)}")
+        results = await asyncio.gather(
+            *(test_func() for _, test_func in tier),
+            return_exceptions=True
+        )
+        for (test_name, _), result in zip(tier, results):
+            if isinstance(result, Exception):
+                print(f"❌ {test_name}: ERROR - {str(result)}")
+            elif result:
                 passed_tests += 1
                 print(f"✅ {test_name}: PASSED")
             else:
                 print(f"❌ {test_name}: FAILED")
-        except Exception as e:
-            print(f"❌ {test_name}: ERROR - {str(e)}")
     
     # Cleanup
     print("\n" + "=" * 60)
@@ -526,13 +585,25 @@ async def main():
         try:
             plan_file = Path(__file__).parent.parent / "RAG_IMPLEMENTATION_PLAN.md"
             if plan_file.exists():
-                content = plan_file.read_text()
-                updated_content = content.replace(
-                    "### **Stage 4: Document Upload & Registration**\n**Status: ⏳ Pending**",
-                    "### **Stage 4: Document Upload & Registration**\n**Status: ✅ Completed**"
-                )
-                plan_file.write_text(updated_content)
-                print("📝 Updated implementation plan status")
+                # Stream into a temp file and rename it over the plan, so an
+                # interrupted run never leaves a truncated plan behind
+                heading = "### **Stage 4: Document Upload & Registration**\n"
+                tmp_file = plan_file.with_suffix(".md.tmp")
+                updated = False
+                previous_line = ""
+                with plan_file.open(encoding="utf-8") as src, tmp_file.open("w", encoding="utf-8") as dst:
+                    for line in src:
+                        if previous_line == heading and line.startswith("**Status: ⏳ Pending**"):
+                            line = line.replace("⏳ Pending", "✅ Completed", 1)
+                            updated = True
+                        dst.write(line)
+                        previous_line = line
+                
+                if updated:
+                    os.replace(tmp_file, plan_file)
+                    print("📝 Updated implementation plan status")
+                else:
+                    tmp_file.unlink()
         except Exception as e:
             print(f"⚠️  Could not update plan: {str(e)}")
         
@@ -3,13 +3,49 @@
 Direct test of AI metadata generation without background processing.
 """
 
+import argparse
 import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
 from app.services.document_ai_service import document_ai_service
 
-async def test_ai_direct():
+# Successful AI results are cached on disk. Cached results are only read when
+# AI_TEST_CACHE=1 (or --use-cache) so a default run always exercises the AI service
+AI_CACHE_DIR = Path.home() / ".cache" / "elenchus" / "ai_meta"
+
+def ai_cache_enabled():
+    return os.environ.get("AI_TEST_CACHE") == "1"
+
+async def generate_metadata_cached(text_content, filename, file_type):
+    """Generate AI metadata, reusing a cached result for identical inputs when enabled."""
+    key_material = "|".join([text_content, filename, file_type or "", document_ai_service.default_model or ""])
+    cache_file = AI_CACHE_DIR / f"{hashlib.sha256(key_material.encode()).hexdigest()}.json"
+    
+    if ai_cache_enabled() and cache_file.exists():
+        print(f"💾 Using cached AI result: {cache_file.name[:16]}...")
+        print("⚠️  The AI service was NOT called; unset AI_TEST_CACHE to test it")
+        return json.loads(cache_file.read_text())
+    
+    result = await document_ai_service.generate_document_metadata(text_content, filename, file_type)
+    
+    if result['success']:
+        # Write atomically so an interrupted run never leaves a partial entry
+        AI_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=AI_CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(result, f, default=str)
+        os.replace(tmp_path, cache_file)
+    
+    return result
+
+async def test_ai_direct(initialize=True):
     """Test AI service directly."""
     
-    await document_ai_service.initialize()
+    if initialize:
+        await document_ai_service.initialize()
     
     print(f"🤖 AI Service initialized: {document_ai_service.is_initialized()}")
     
@@ -43,7 +79,7 @@ async def test_ai_direct():
     
     print("\n📝 Testing AI metadata generation...")
     
-    result = await document_ai_service.generate_document_metadata(
+    result = await generate_metadata_cached(
         test_content,
         "business_proposal.txt",
         "txt"
@@ -66,4 +102,10 @@ async def test_ai_direct():
         print(f"❌ Error: {result['error']}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Direct AI metadata generation test")
+    parser.add_argument("--use-cache", action="store_true", help="Reuse cached AI results instead of calling the AI service")
+    args = parser.parse_args()
+    if args.use_cache:
+        os.environ["AI_TEST_CACHE"] = "1"
+    
     asyncio.run(test_ai_direct())
\ No newline at end of file
@@ -4,6 +4,7 @@ Test AI metadata generation for uploaded documents.
 """
 
 import asyncio
+import os
 import time
 from datetime import datetime
 from app.models.user import User
@@ -11,13 +12,13 @@ from app.services.rag_upload_service import rag_upload_service
 from app.services.gcp_service import gcp_service
 from app.services.document_ai_service import document_ai_service
 from app.database import mongodb_manager
-from app.models.rag_document import RAGDocument
+from upload_test_helpers import wait_for_processing
 
 class MockFile:
-    def __init__(self, filename, content, content_type=None):
+    def __init__(self, filename, content, content_type):
         self.filename = filename
         self.file = None
-        self.content_type = content_type or "text/plain"
+        self.content_type = content_type
         self._content = content
     
     async def read(self):
@@ -26,14 +27,91 @@ class MockFile:
     async def seek(self, pos):
         pass
 
-async def test_ai_metadata_generation():
+async def initialize_services():
+    """Initialize the service graph shared by the AI tests."""
+    await asyncio.gather(
+        mongodb_manager.initialize(),
+        gcp_service.initialize(),
+        document_ai_service.initialize()
+    )
+    # The upload service needs MongoDB to be ready
+    await rag_upload_service.initialize()
+
+async def run_test_case(user, test_file):
+    """Upload one test file and report the AI metadata generated for it."""
+    print(f"\n📄 Testing: {test_file['filename']}")
+    print("=" * 50)
+    
+    mock_file = MockFile(
+        test_file['filename'], 
+        test_file['content'].encode(),
+        test_file['content_type']
+    )
+    
+    try:
+        # Upload document
+        start_time = time.time()
+        document = await rag_upload_service.upload_document(
+            user_id=str(user.id),
+            file=mock_file,
+            tags=["test", "ai-metadata"],
+            category="testing",
+            background_tasks=None  # No background processing for this test
+        )
+        
+        print(f"✅ Document uploaded: {document.id}")
+        print(f"   Status: {document.status}")
+        print(f"   GCS Path: {document.gcs_path[:50]}..." if document.gcs_path else "   No GCS Path")
+        
+        # Wait for background processing to complete
+        print("⏳ Waiting for background processing...")
+        updated_doc = await wait_for_processing(document.id)
+        if updated_doc:
+            document = updated_doc
+        
+        # Display results
+        print(f"\n📊 Results for {test_file['filename']}:")
+        print(f"   Final Status: {document.status}")
+        print(f"   Processing Time: {time.time() - start_time:.1f}s")
+        
+        if document.metadata.ai_summary:
+            print(f"\n🤖 AI-Generated Summary:")
+            print(f"   {document.metadata.ai_summary}")
+            
+            print(f"\n📝 AI-Generated Description:")
+            desc = document.metadata.ai_detailed_description
+            if desc and len(desc) > 200:
+                print(f"   {desc[:200]}...")
+            else:
+                print(f"   {desc}")
+            
+            print(f"\n🏷️  AI-Generated Topics:")
+            for i, topic in enumerate(document.metadata.ai_topics or [], 1):
+                print(f"   {i}. {topic}")
+            
+            print(f"\n📅 Generated At: {document.metadata.ai_metadata_generated_at}")
+            
+        else:
+            print("⚠️  No AI metadata generated")
+            if document.processing_metrics.errors_encountered:
+                print(f"   Errors: {document.processing_metrics.errors_encountered}")
+        
+        print(f"\n📥 Download Available: {'Yes' if document.gcs_path else 'No'}")
+        
+    except Exception as e:
+        # Cases run concurrently; full tracebacks from every failing case would
+        # flood stdout, so only print them when asked to
+        print(f"❌ Test failed for {test_file['filename']}: {str(e)}")
+        if os.getenv("CI_VERBOSE"):
+            import traceback
+            traceback.print_exc()
+
+async def test_ai_metadata_generation(initialize=True):
     """Test the AI metadata generation for different document types."""
     
-    # Initialize services
-    await mongodb_manager.initialize()
-    await gcp_service.initialize()
-    await document_ai_service.initialize()
-    await rag_upload_service.initialize()
+    # Initialize services unless a shared runner already did
+    if initialize:
+        await initialize_services()
     
     # Get test user
     user = await User.find_one({"email": "test@example.com"})
@@ -88,86 +166,8 @@ Q1 2025,2250000,1650000,600000,26.7%""".strip(),
         }
     ]
     
-    for test_file in test_files:
-        print(f"\n📄 Testing: {test_file['filename']}")
-        print("=" * 50)
-        
-        mock_file = MockFile(
-            test_file['filename'], 
-            test_file['content'].encode(),
-            test_file['content_type']
-        )
-        
-        try:
-            # Upload document
-            start_time = time.time()
-            document = await rag_upload_service.upload_document(
-                user_id=str(user.id),
-                file=mock_file,
-                tags=["test", "ai-metadata"],
-                category="testing",
-                background_tasks=None  # No background processing for this test
-            )
-            
-            print(f"✅ Document uploaded: {document.id}")
-            print(f"   Status: {document.status}")
-            print(f"   GCS Path: {document.gcs_path[:50]}..." if document.gcs_path else "   No GCS Path")
-            
-            # Wait for background processing to complete
-            print("⏳ Waiting for background processing...")
-            max_wait = 60  # Wait up to 60 seconds
-            check_interval = 3
-            
-            for i in range(max_wait // check_interval):
-                await asyncio.sleep(check_interval)
-                
-                # Check document status
-                updated_doc = await RAGDocument.find_one(RAGDocument.id == document.id)
-                if updated_doc:
-                    print(f"   Status check {i+1}: {updated_doc.status}")
-                    
-                    if updated_doc.status in ['completed', 'failed']:
-                        document = updated_doc
-                        break
-                    
-                    # Check if AI metadata is available
-                    if updated_doc.metadata.ai_summary:
-                        document = updated_doc
-                        break
-            
-            # Display results
-            print(f"\n📊 Results for {test_file['filename']}:")
-            print(f"   Final Status: {document.status}")
-            print(f"   Processing Time: {time.time() - start_time:.1f}s")
-            
-            if document.metadata.ai_summary:
-                print(f"\n🤖 AI-Generated Summary:")
-                print(f"   {document.metadata.ai_summary}")
-                
-                print(f"\n📝 AI-Generated Description:")
-                desc = document.metadata.ai_detailed_description
-                if desc and len(desc) > 200:
-                    print(f"   {desc[:200]}...")
-                else:
-                    print(f"   {desc}")
-                
-                print(f"\n🏷️  AI-Generated Topics:")
-                for i, topic in enumerate(document.metadata.ai_topics or [], 1):
-                    print(f"   {i}. {topic}")
-                
-                print(f"\n📅 Generated At: {document.metadata.ai_metadata_generated_at}")
-                
-            else:
-                print("⚠️  No AI metadata generated")
-                if document.processing_metrics.errors_encountered:
-                    print(f"   Errors: {document.processing_metrics.errors_encountered}")
-            
-            print(f"\n📥 Download Available: {'Yes' if document.gcs_path else 'No'}")
-            
-        except Exception as e:
-            print(f"❌ Test failed: {str(e)}")
-            import traceback
-            traceback.print_exc()
+    # Cases are independent uploads, so their processing waits overlap
+    await asyncio.gather(*(run_test_case(user, test_file) for test_file in test_files))
     
     print("\n🎉 AI Metadata Generation Test Completed!")
 
@@ -12,10 +12,12 @@ from app.services.document_ai_service import document_ai_service
 async def test_background():
     """Test background processing directly."""
     
-    # Initialize services
-    await mongodb_manager.initialize()
-    await gcp_service.initialize()
-    await document_ai_service.initialize()
+    # Initialize independent services concurrently; the upload service needs MongoDB
+    await asyncio.gather(
+        mongodb_manager.initialize(),
+        gcp_service.initialize(),
+        document_ai_service.initialize()
+    )
     await rag_upload_service.initialize()
     
     print(f"🤖 AI Service: {document_ai_service.is_initialized()}")
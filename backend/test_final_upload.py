@@ -5,6 +5,7 @@ Final test of document upload with all fixes applied.
 
 import asyncio
 from datetime import datetime
+from io import BytesIO
 from app.models.user import User
 from app.services.rag_upload_service import rag_upload_service
 from app.database import mongodb_manager
@@ -14,20 +15,59 @@ from app.services.gcp_service import gcp_service
 class MockFile:
     def __init__(self, filename, content, content_type=None):
         self.filename = filename
-        self.file = None
+        # BytesIO shares the initial bytes, so reads and rewinds don't copy the body
+        self.file = BytesIO(content)
         self.content_type = content_type or "application/octet-stream"
-        self._content = content
     
     async def read(self):
-        return self._content
+        return self.file.getvalue()
     
     async def seek(self, pos):
-        pass
+        self.file.seek(pos)
+
+async def upload_test_file(user, filename, content, content_type):
+    """Upload one test file and verify it was saved."""
+    print(f"\n📤 Testing upload of {filename}...")
+    
+    mock_file = MockFile(filename, content, content_type)
+    
+    try:
+        # Upload document
+        document = await rag_upload_service.upload_document(
+            user_id=str(user.id),
+            file=mock_file,
+            tags=["test", "final"],
+            category="testing",
+            background_tasks=None
+        )
+        
+        print(f"✅ Document created:")
+        print(f"   ID: {document.id}")
+        print(f"   Status: {document.status}")
+        print(f"   GCS Path: {document.gcs_path}")
+        print(f"   File Type: {document.file_type}")
+        
+        # Check if properly saved; upload_document has already awaited the insert
+        saved_doc = await RAGDocument.find_one(RAGDocument.id == document.id)
+        
+        if saved_doc:
+            if saved_doc.gcs_path:
+                print(f"   ✅ Uploaded to GCS: {saved_doc.gcs_path}")
+            else:
+                print(f"   ⚠️  No GCS path")
+            
+            if saved_doc.processing_metrics.errors_encountered:
+                print(f"   ⚠️  Errors: {saved_doc.processing_metrics.errors_encountered}")
+        
+    except Exception as e:
+        print(f"❌ Upload failed: {str(e)}")
 
 async def test_final_upload():
-    # Initialize services
-    await mongodb_manager.initialize()
-    await gcp_service.initialize()
+    # Initialize independent services concurrently; the upload service needs MongoDB
+    await asyncio.gather(
+        mongodb_manager.initialize(),
+        gcp_service.initialize()
+    )
     await rag_upload_service.initialize()
     
     # Get test user
@@ -47,42 +87,14 @@ async def test_final_upload():
         ("test_document.docx", b"PK fake docx content for testing", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"),
     ]
     
-    for filename, content, content_type in test_files:
-        print(f"\n📤 Testing upload of {filename}...")
-        
-        mock_file = MockFile(filename, content, content_type)
-        
-        try:
-            # Upload document
-            document = await rag_upload_service.upload_document(
-                user_id=str(user.id),
-                file=mock_file,
-                tags=["test", "final"],
-                category="testing",
-                background_tasks=None
-            )
-            
-            print(f"✅ Document created:")
-            print(f"   ID: {document.id}")
-            print(f"   Status: {document.status}")
-            print(f"   GCS Path: {document.gcs_path}")
-            print(f"   File Type: {document.file_type}")
-            
-            # Check if properly saved
-            await asyncio.sleep(0.5)
-            saved_doc = await RAGDocument.find_one(RAGDocument.id == document.id)
-            
-            if saved_doc:
-                if saved_doc.gcs_path:
-                    print(f"   ✅ Uploaded to GCS: {saved_doc.gcs_path}")
-                else:
-                    print(f"   ⚠️  No GCS path")
-                
-                if saved_doc.processing_metrics.errors_encountered:
-                    print(f"   ⚠️  Errors: {saved_doc.processing_metrics.errors_encountered}")
-            
-        except Exception as e:
-            print(f"❌ Upload failed: {str(e)}")
+    # Uploads are independent; bound concurrency for larger file sets
+    semaphore = asyncio.Semaphore(16)
+    
+    async def upload_bounded(filename, content, content_type):
+        async with semaphore:
+            await upload_test_file(user, filename, content, content_type)
+    
+    await asyncio.gather(*(upload_bounded(*test_file) for test_file in test_files))
     
     print("\n🎉 All tests completed!")
 
@@ -1,21 +1,32 @@
 #!/usr/bin/env python3
 """Test document upload through HTTP API endpoint."""
 
-import requests
+import asyncio
+import httpx
 import json
 import sys
 from pathlib import Path
 
-def test_http_upload():
+BASE_URL = "http://localhost:8000"
+# Form field values are fixed, so serialize them once at import
+UPLOAD_TAGS_JSON = json.dumps(["test", "http", "verification"])
+
+def create_client():
+    """Create an async client that keeps connections alive across API calls."""
+    # Transport retries cover connection failures only, so uploads aren't resent
+    transport = httpx.AsyncHTTPTransport(
+        retries=3,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    )
+    return httpx.AsyncClient(base_url=BASE_URL, transport=transport, timeout=30)
+
+async def test_http_upload(client):
     """Test document upload via HTTP API."""
     
     print("=" * 60)
     print("HTTP Document Upload Test")
     print("=" * 60)
     
-    # API configuration
-    base_url = "http://localhost:8000"
-    
     # First, we need to login to get a token
     print("\n🔐 Logging in...")
     
@@ -25,8 +36,8 @@ def test_http_upload():
         "password": "testpassword123"
     }
     
-    login_response = requests.post(
-        f"{base_url}/api/v1/auth/login",
+    login_response = await client.post(
+        "/api/v1/auth/login",
         data=login_data
     )
     
@@ -49,8 +60,8 @@ def test_http_upload():
             "full_name": "Test User"
         }
         
-        register_response = requests.post(
-            f"{base_url}/api/v1/auth/register",
+        register_response = await client.post(
+            "/api/v1/auth/register",
             json=register_data
         )
         
@@ -58,8 +69,8 @@ def test_http_upload():
             print("   ✅ Registration successful")
             
             # Now login
-            login_response = requests.post(
-                f"{base_url}/api/v1/auth/login",
+            login_response = await client.post(
+                "/api/v1/auth/login",
                 data=login_data
             )
             
@@ -97,12 +108,12 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
     }
     
     data = {
-        'tags': json.dumps(["test", "http", "verification"]),
+        'tags': UPLOAD_TAGS_JSON,
         'category': 'testing'
     }
     
-    upload_response = requests.post(
-        f"{base_url}/api/v1/rag/documents/upload",
+    upload_response = await client.post(
+        "/api/v1/rag/documents/upload",
         headers=headers,
         files=files,
         data=data
@@ -118,13 +129,21 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
         
         document_id = upload_data.get('id')
         
-        # Check document status
-        print("\n🔍 Checking document status...")
-        status_response = requests.get(
-            f"{base_url}/api/v1/rag/documents/{document_id}/status",
-            headers=headers
+        # Status and listing are independent, so fetch them concurrently
+        status_response, list_response = await asyncio.gather(
+            client.get(
+                f"/api/v1/rag/documents/{document_id}/status",
+                headers=headers
+            ),
+            client.get(
+                "/api/v1/rag/documents",
+                headers=headers,
+                params={"limit": 5}
+            )
         )
         
+        # Check document status
+        print("\n🔍 Checking document status...")
         if status_response.status_code == 200:
             status_data = status_response.json()
             print("   ✅ Status retrieved")
@@ -137,12 +156,6 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
         
         # List user documents
         print("\n📋 Listing user documents...")
-        list_response = requests.get(
-            f"{base_url}/api/v1/rag/documents",
-            headers=headers,
-            params={"limit": 5}
-        )
-        
         if list_response.status_code == 200:
             list_data = list_response.json()
             documents = list_data.get('documents', [])
@@ -152,13 +165,17 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
         else:
             print("   ❌ Failed to list documents")
         
-        # Delete test document
-        print("\n🗑️  Deleting test document...")
-        delete_response = requests.delete(
-            f"{base_url}/api/v1/rag/documents/{document_id}",
-            headers=headers
+        # The health check doesn't depend on the document, so overlap it with the delete
+        delete_response, health_response = await asyncio.gather(
+            client.delete(
+                f"/api/v1/rag/documents/{document_id}",
+                headers=headers
+            ),
+            client.get("/api/v1/rag/health")
         )
         
+        # Delete test document
+        print("\n🗑️  Deleting test document...")
         if delete_response.status_code == 200:
             print("   ✅ Document deleted")
         else:
@@ -172,8 +189,6 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
     
     # Check RAG health
     print("\n🏥 Checking RAG system health...")
-    health_response = requests.get(f"{base_url}/api/v1/rag/health")
-    
     if health_response.status_code == 200:
         health_data = health_response.json()
         print(f"   Overall status: {health_data.get('status')}")
@@ -187,24 +202,32 @@ Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris."""
     return True
 
 
+async def main():
+    """Check the server is up, then run the upload test on one client."""
+    async with create_client() as client:
+        try:
+            # Check if server is running
+            response = await client.get("/health", timeout=2)
+        except httpx.ConnectError:
+            print(f"❌ Cannot connect to server at {BASE_URL}")
+            print("   Please start the server first!")
+            return 1
+        
+        if response.status_code != 200:
+            print("❌ Server returned unexpected status")
+            return 1
+        
+        print("✅ Server is running\n")
+        success = await test_http_upload(client)
+        return 0 if success else 1
+
+
 if __name__ == "__main__":
     print("\n⚠️  Make sure the backend server is running on port 8000!")
     print("   Run: cd backend && ./devrun.sh\n")
     
     try:
-        # Check if server is running
-        response = requests.get("http://localhost:8000/health", timeout=2)
-        if response.status_code == 200:
-            print("✅ Server is running\n")
-            success = test_http_upload()
-            sys.exit(0 if success else 1)
-        else:
-            print("❌ Server returned unexpected status")
-            sys.exit(1)
-    except requests.ConnectionError:
-        print("❌ Cannot connect to server at http://localhost:8000")
-        print("   Please start the server first!")
-        sys.exit(1)
+        sys.exit(asyncio.run(main()))
     except Exception as e:
         print(f"❌ Error: {str(e)}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
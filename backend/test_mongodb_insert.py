@@ -4,38 +4,43 @@ Test MongoDB insertion to isolate the language field issue.
 """
 
 import asyncio
+import time
 from app.models.rag_chunk import RAGChunk, ChunkType, ChunkMetadata
 from app.database import mongodb_manager
 
 async def test_chunk_insertion():
-    """Test inserting a chunk to see if it fails."""
+    """Test bulk-inserting chunks to see if it fails."""
     
     await mongodb_manager.initialize()
     
     try:
-        # Create a simple chunk without any language field
-        chunk = RAGChunk(
-            document_id="test_doc_id",
-            user_id="test_user_id",
-            chunk_index=0,
-            chunk_id="test_chunk_0",
-            text="This is a test chunk for MongoDB insertion testing.",
-            text_hash="test_hash_123",
-            chunk_type=ChunkType.TEXT,
-            metadata=ChunkMetadata(
-                page_number=1,
-                word_count=10,
-                char_count=50,
-                sentence_count=1
+        # Create simple chunks without any language field
+        chunks = [
+            RAGChunk(
+                document_id="test_doc_id",
+                user_id="test_user_id",
+                chunk_index=i,
+                chunk_id=f"test_chunk_{i}",
+                text=f"This is test chunk {i} for MongoDB insertion testing.",
+                text_hash=f"test_hash_{i}",
+                chunk_type=ChunkType.TEXT,
+                metadata=ChunkMetadata(
+                    page_number=1,
+                    word_count=10,
+                    char_count=50,
+                    sentence_count=1
+                )
             )
-        )
+            for i in range(64)
+        ]
         
-        print("Attempting to insert chunk...")
-        await chunk.insert()
-        print("✅ Chunk inserted successfully")
+        print(f"Attempting to insert {len(chunks)} chunks...")
+        start_time = time.perf_counter()
+        await RAGChunk.insert_many(chunks, ordered=False)
+        print(f"✅ Chunks inserted successfully in {(time.perf_counter() - start_time) * 1000:.1f}ms")
         
         # Clean up
-        await chunk.delete()
+        await RAGChunk.find(RAGChunk.document_id == "test_doc_id").delete()
         print("✅ Cleanup completed")
         
     except Exception as e:
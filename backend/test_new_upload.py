@@ -25,11 +25,11 @@ class MockFile:
         pass
 
 async def test_new_upload():
-    # Initialize database
-    await mongodb_manager.initialize()
-    
-    # Initialize GCP service first
-    gcp_init = await gcp_service.initialize()
+    # Initialize database and GCP service concurrently
+    _, gcp_init = await asyncio.gather(
+        mongodb_manager.initialize(),
+        gcp_service.initialize()
+    )
     print(f"GCP Service initialized: {gcp_init}")
     
     # Initialize RAG upload service
@@ -44,8 +44,10 @@ async def test_new_upload():
     print(f"✅ Found user: {user.email}")
     
     # Create test file
-    test_content = f"Test document created at {datetime.utcnow()}\nThis is a test to verify GCS upload works after MongoDB fix."
-    mock_file = MockFile("test_after_fix.txt", test_content.encode())
+    test_content = b"Test document created at %s\nThis is a test to verify GCS upload works after MongoDB fix." % (
+        datetime.utcnow().isoformat(sep=" ").encode("ascii")
+    )
+    mock_file = MockFile("test_after_fix.txt", test_content)
     
     # Upload document
     print("\n📤 Uploading document...")
@@ -64,10 +66,7 @@ async def test_new_upload():
         print(f"   GCS Path: {document.gcs_path}")
         print(f"   File Size: {document.file_size}")
         
-        # Check if it was saved properly
-        await asyncio.sleep(1)
-        
-        # Reload from database
+        # Check if it was saved properly, reloading from database
         saved_doc = await RAGDocument.find_one(RAGDocument.id == document.id)
         if saved_doc:
             print(f"\n✅ Document saved to MongoDB:")
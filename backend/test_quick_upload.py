@@ -3,49 +3,23 @@
 Quick test of the complete upload and AI metadata functionality.
 """
 
+import argparse
 import asyncio
+import random
 import time
 from datetime import datetime
+from io import BytesIO
+from fastapi import UploadFile
+from pymongo.errors import AutoReconnect, ConnectionFailure, ServerSelectionTimeoutError
 from app.models.user import User
 from app.services.rag_upload_service import rag_upload_service
 from app.services.gcp_service import gcp_service
 from app.services.document_ai_service import document_ai_service
 from app.database import mongodb_manager
-from app.models.rag_document import RAGDocument
+from upload_test_helpers import wait_for_processing
 
-class MockFile:
-    def __init__(self, filename, content, content_type="text/plain"):
-        self.filename = filename
-        self.file = None
-        self.content_type = content_type
-        self._content = content
-    
-    async def read(self):
-        return self._content
-    
-    async def seek(self, pos):
-        pass
-
-async def quick_test():
-    """Quick test of the upload and AI functionality."""
-    
-    # Initialize services
-    await mongodb_manager.initialize()
-    await gcp_service.initialize()
-    await document_ai_service.initialize()
-    await rag_upload_service.initialize()
-    
-    # Get test user
-    user = await User.find_one({"email": "test@example.com"})
-    if not user:
-        print("❌ Test user not found")
-        return
-    
-    print(f"✅ User: {user.email}")
-    print(f"🤖 AI Service: {document_ai_service.is_initialized()}")
-    
-    # Test simple document
-    content = """
+# Test document, encoded once and shared by every upload
+CONTENT = """
     BUSINESS PROPOSAL
     
     Executive Summary:
@@ -62,43 +36,131 @@ async def quick_test():
     Implementation Plan:
     We will establish regional offices in London, Berlin, and Paris to serve as our European headquarters.
     """.strip()
-    
-    mock_file = MockFile("business_proposal.txt", content.encode())
+CONTENT_BYTES = CONTENT.encode()
+
+# Errors worth retrying: transient MongoDB connectivity failures only. GCS
+# errors never surface here (upload_file reports them in its result)
+RETRYABLE_ERRORS = (AutoReconnect, ConnectionFailure, ServerSelectionTimeoutError)
+
+async def with_retry(coro_factory, tries=4, base=0.5):
+    """Await coro_factory(), retrying transient errors with jittered exponential backoff."""
+    for attempt in range(tries):
+        try:
+            return await coro_factory()
+        except RETRYABLE_ERRORS:
+            if attempt == tries - 1:
+                raise
+            await asyncio.sleep(base * (2 ** attempt) + random.random() * 0.1)
+
+def _silent(*args, **kwargs):
+    pass
+
+async def upload_one(user, index, content, quiet=False):
+    """Upload one copy of the test document and report its AI results."""
+    report = _silent if quiet else print
+    filename = "business_proposal.txt" if index == 0 else f"business_proposal_{index}.txt"
+    # BytesIO shares the initial bytes; the upload service reads the buffer
+    # directly and GCS streams from it, so the payload is never copied
+    upload_file = UploadFile(
+        filename=filename,
+        file=BytesIO(content),
+        size=len(content),
+        headers={"content-type": "text/plain"}
+    )
     
     try:
         # Upload document
-        print(f"\n📤 Uploading document...")
-        document = await rag_upload_service.upload_document(
+        report(f"\n📤 Uploading {filename}...")
+        upload_started = datetime.utcnow()
+        # Only connectivity errors are retried. Uploads are deduplicated by content
+        # hash, but a retry after the GCS upload stores the file under a new blob
+        document = await with_retry(lambda: rag_upload_service.upload_document(
             user_id=str(user.id),
-            file=mock_file,
+            file=upload_file,
             tags=["business", "proposal"],
             category="planning",
             background_tasks=None
-        )
+        ))
         
-        print(f"✅ Upload successful: {document.id}")
-        print(f"   GCS Path: {'Yes' if document.gcs_path else 'No'}")
+        # The service deduplicates by content hash before touching GCS or the AI
+        # service, so reruns with the same content get the stored document back
+        if document.created_at < upload_started:
+            report(f"♻️  Reusing existing document with identical content: {document.id}")
+        else:
+            report(f"✅ Upload successful: {document.id}")
+        report(f"   GCS Path: {'Yes' if document.gcs_path else 'No'}")
         
-        # Wait briefly for processing
-        print("⏳ Waiting for AI processing...")
-        await asyncio.sleep(10)
+        # Wait for processing, returning as soon as results are available
+        report("⏳ Waiting for AI processing...")
+        updated_doc = await wait_for_processing(
+            document.id, max_wait=30, max_delay=2.0, retry=with_retry, quiet=quiet
+        )
         
         # Check results
-        updated_doc = await RAGDocument.find_one(RAGDocument.id == document.id)
         if updated_doc:
-            print(f"\n📊 Results:")
-            print(f"   Status: {updated_doc.status}")
+            report(f"\n📊 Results for {filename}:")
+            report(f"   Status: {updated_doc.status}")
             
             if updated_doc.metadata.ai_summary:
-                print(f"   AI Summary: {updated_doc.metadata.ai_summary}")
-                print(f"   AI Topics: {updated_doc.metadata.ai_topics}")
+                report(f"   AI Summary: {updated_doc.metadata.ai_summary}")
+                report(f"   AI Topics: {updated_doc.metadata.ai_topics}")
             else:
-                print("   No AI metadata yet")
+                report("   No AI metadata yet")
         
-        print(f"\n🔗 Download URL: /api/v1/rag/documents/{document.id}/download")
+        report(f"\n🔗 Download URL: /api/v1/rag/documents/{document.id}/download")
+        return document
         
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
+        print(f"❌ Error uploading {filename}: {str(e)}")
+        return None
+
+async def quick_test(count=1, concurrency=50, quiet=False):
+    """Quick test of the upload and AI functionality."""
+    
+    # Initialize independent services concurrently; the upload service needs MongoDB
+    await asyncio.gather(
+        mongodb_manager.initialize(),
+        gcp_service.initialize(),
+        document_ai_service.initialize()
+    )
+    await rag_upload_service.initialize()
+    
+    # Get test user
+    user = await User.find_one({"email": "test@example.com"})
+    if not user:
+        print("❌ Test user not found")
+        return
+    
+    print(f"✅ User: {user.email}")
+    print(f"🤖 AI Service: {document_ai_service.is_initialized()}")
+    
+    # Uploads are deduplicated by content hash, so extra copies get a distinct suffix
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def upload_bounded(index):
+        async with semaphore:
+            copy_content = CONTENT_BYTES if index == 0 else CONTENT_BYTES + f"\n\nCopy {index}".encode()
+            return await upload_one(user, index, copy_content, quiet)
+    
+    start_time = time.time()
+    results = await asyncio.gather(*(upload_bounded(index) for index in range(count)))
+    
+    if count > 1:
+        succeeded = sum(1 for result in results if result is not None)
+        print(f"\n📈 {succeeded}/{count} uploads succeeded in {time.time() - start_time:.1f}s")
 
 if __name__ == "__main__":
-    asyncio.run(quick_test())
\ No newline at end of file
+    # Prefer the libuv-based event loop when it's installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    parser = argparse.ArgumentParser(description="Quick upload and AI metadata test")
+    parser.add_argument("--count", type=int, default=1, help="Number of documents to upload")
+    parser.add_argument("--concurrency", type=int, default=50, help="Maximum concurrent uploads")
+    parser.add_argument("--quiet", action="store_true", help="Only report errors and the summary")
+    args = parser.parse_args()
+    
+    asyncio.run(quick_test(count=args.count, concurrency=args.concurrency, quiet=args.quiet))
@@ -3,79 +3,132 @@
 Test document upload without email verification requirement.
 """
 
+import argparse
 import asyncio
+import aiofiles
 import aiohttp
+import json
 import sys
 from pathlib import Path
 
-async def test_upload():
-    # First, login to get a token
-    async with aiohttp.ClientSession() as session:
-        # Login
-        login_data = {
-            "email": "test@example.com",
-            "password": "TestPassword123!"
-        }
+BASE_URL = "http://localhost:8000"
+# Uploaded straight from memory; the fixture never needs to touch disk
+TEST_DOCUMENT = b"This is a test document for RAG upload without email verification."
+UPLOAD_CHUNK_SIZE = 1 << 20
+# Request payloads are fixed, so serialize them once at import
+LOGIN_JSON = json.dumps({"email": "test@example.com", "password": "TestPassword123!"})
+UPLOAD_TAGS_JSON = json.dumps(["test", "no-verification"])
+
+async def stream_file(path, chunk_size=UPLOAD_CHUNK_SIZE):
+    """Yield a file's contents in fixed-size chunks without blocking the event loop."""
+    async with aiofiles.open(path, 'rb') as f:
+        while chunk := await f.read(chunk_size):
+            yield chunk
+
+async def login(session):
+    """Log in as the test user, returning the auth response or None on failure."""
+    async with session.post(
+        f"{BASE_URL}/api/v1/auth/login",
+        data=LOGIN_JSON,
+        headers={"Content-Type": "application/json"}
+    ) as response:
+        if response.status != 200:
+            print(f"Login failed: {response.status}")
+            text = await response.text()
+            print(f"Response: {text}")
+            return None
         
-        async with session.post(
-            "http://localhost:8000/api/v1/auth/login",
-            json=login_data
-        ) as response:
-            if response.status != 200:
-                print(f"Login failed: {response.status}")
-                text = await response.text()
-                print(f"Response: {text}")
-                return
-            
-            auth_response = await response.json()
-            token = auth_response["access_token"]
-            print(f"✅ Login successful")
-            print(f"   User: {auth_response['user']['email']}")
-            print(f"   Verified: {auth_response['user']['is_verified']}")
+        return await response.json()
+
+def build_upload_form(file_path=None):
+    """Build the multipart upload form for the built-in document or a file."""
+    # Larger fixtures are streamed from disk so reads overlap with sending
+    # and only one chunk is held in memory
+    data = aiohttp.FormData()
+    if file_path:
+        data.add_field('file',
+                      stream_file(file_path),
+                      filename=file_path.name,
+                      content_type='application/octet-stream')
+    else:
+        data.add_field('file',
+                      TEST_DOCUMENT,
+                      filename='test_document.txt',
+                      content_type='text/plain')
+    data.add_field('tags', UPLOAD_TAGS_JSON)
+    data.add_field('category', 'test')
+    return data
+
+async def test_upload(file_path=None):
+    # One session (and connector) carries both the login and the upload, so
+    # DNS results and the keep-alive connection are reused
+    connector = aiohttp.TCPConnector(limit=32, keepalive_timeout=60, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        # Open the pooled connection up front with a cheap health check, so
+        # the login and upload requests don't pay for the connect
+        try:
+            async with session.get(f"{BASE_URL}/health") as response:
+                await response.read()
+        except aiohttp.ClientConnectionError:
+            print(f"❌ Cannot connect to server at {BASE_URL}")
+            return
+        
+        # First, login to get a token. Yield once so the login task starts
+        # sending its request, then build the upload form while it's in flight
+        login_task = asyncio.create_task(login(session))
+        await asyncio.sleep(0)
+        data = build_upload_form(file_path)
+        auth_response = await login_task
+        if auth_response is None:
+            return
+        
+        token = auth_response["access_token"]
+        print(f"✅ Login successful")
+        print(f"   User: {auth_response['user']['email']}")
+        print(f"   Verified: {auth_response['user']['is_verified']}")
         
         # Prepare headers with auth token
         headers = {
             "Authorization": f"Bearer {token}"
         }
         
-        # Create a test file
-        test_file_path = Path("/tmp/test_document.txt")
-        test_file_path.write_text("This is a test document for RAG upload without email verification.")
-        
         # Upload document
-        with open(test_file_path, 'rb') as f:
-            data = aiohttp.FormData()
-            data.add_field('file',
-                          f,
-                          filename='test_document.txt',
-                          content_type='text/plain')
-            data.add_field('tags', '["test", "no-verification"]')
-            data.add_field('category', 'test')
+        async with session.post(
+            f"{BASE_URL}/api/v1/rag/documents/upload",
+            data=data,
+            headers=headers
+        ) as response:
+            print(f"\n📤 Upload response status: {response.status}")
             
-            async with session.post(
-                "http://localhost:8000/api/v1/rag/documents/upload",
-                data=data,
-                headers=headers
-            ) as response:
-                print(f"\n📤 Upload response status: {response.status}")
+            if response.status == 200:
+                result = await response.json()
+                print(f"✅ Upload successful!")
+                print(f"   Document ID: {result['id']}")
+                print(f"   Filename: {result['filename']}")
+                print(f"   Status: {result['status']}")
+            else:
+                text = await response.text()
+                print(f"❌ Upload failed: {text}")
+                
+                # Check if it's the email verification error
+                if "Email not verified" in text:
+                    print("\n⚠️  ISSUE: Email verification is still required!")
+                    print("   The fix may not have been applied correctly.")
                 
-                if response.status == 200:
-                    result = await response.json()
-                    print(f"✅ Upload successful!")
-                    print(f"   Document ID: {result['id']}")
-                    print(f"   Filename: {result['filename']}")
-                    print(f"   Status: {result['status']}")
-                else:
-                    text = await response.text()
-                    print(f"❌ Upload failed: {text}")
-                    
-                    # Check if it's the email verification error
-                    if "Email not verified" in text:
-                        print("\n⚠️  ISSUE: Email verification is still required!")
-                        print("   The fix may not have been applied correctly.")
-                    
-                return response.status
+            return response.status
 
 if __name__ == "__main__":
-    result = asyncio.run(test_upload())
+    # Prefer the libuv-based event loop when it's installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
+    parser = argparse.ArgumentParser(description="Upload test without email verification")
+    parser.add_argument("--file", type=Path, help="Upload this file instead of the built-in document")
+    args = parser.parse_args()
+    
+    result = asyncio.run(test_upload(args.file))
     sys.exit(0 if result == 200 else 1)
\ No newline at end of file
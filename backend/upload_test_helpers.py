@@ -0,0 +1,68 @@
+"""
+Helpers shared by the upload and AI metadata test scripts.
+"""
+
+import asyncio
+from app.models.rag_document import RAGDocument
+from pymongo.errors import OperationFailure
+
+DONE_STATUSES = ['completed', 'failed']
+
+def is_processing_done(document):
+    """A document is done once processing finishes or AI metadata is available."""
+    return document.status in DONE_STATUSES or bool(document.metadata.ai_summary)
+
+def _is_raw_processing_done(raw_document):
+    """is_processing_done for a raw change-stream document."""
+    return raw_document.get("status") in DONE_STATUSES or bool(raw_document.get("metadata", {}).get("ai_summary"))
+
+def _silent(*args, **kwargs):
+    pass
+
+async def wait_for_processing(document_id, max_wait=60, initial_delay=0.25, max_delay=4.0, retry=None, quiet=False):
+    """Wait until a document is done processing.
+    
+    Woken by a change stream when the deployment supports one, otherwise
+    polls with exponential backoff. Each read goes through retry(coro_factory)
+    when given. Returns the latest document, or None if it no longer exists.
+    """
+    report = _silent if quiet else print
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_wait
+    get = lambda: RAGDocument.find_one(RAGDocument.id == document_id)
+    fetch = (lambda: retry(get)) if retry else get
+    collection = RAGDocument.get_motor_collection()
+    pipeline = [{"$match": {"operationType": "update", "documentKey._id": document_id}}]
+    
+    try:
+        async with collection.watch(pipeline, full_document="updateLookup", max_await_time_ms=1000) as stream:
+            # Open the cursor before reading the current state so no update is missed
+            await stream.try_next()
+            document = await fetch()
+            if document is None or is_processing_done(document):
+                return document
+            report(f"   Status: {document.status} (waiting for change)")
+            while loop.time() < deadline:
+                change = await stream.try_next()
+                if change is None:
+                    continue
+                raw_document = change.get("fullDocument") or {}
+                if _is_raw_processing_done(raw_document):
+                    break
+                report(f"   Status: {raw_document.get('status')} (waiting for change)")
+            return await fetch()
+    except OperationFailure:
+        # Change streams need a replica set; fall back to polling on standalone servers
+        report("   Change streams unavailable, polling instead")
+    
+    # Poll with exponential backoff so fast jobs are seen quickly
+    delay = initial_delay
+    check = 1
+    while True:
+        document = await fetch()
+        if document is None or is_processing_done(document) or loop.time() >= deadline:
+            return document
+        report(f"   Status check {check}: {document.status}")
+        await asyncio.sleep(min(delay, max(deadline - loop.time(), 0)))
+        delay = min(delay * 2, max_delay)
+        check += 1
@@ -3,6 +3,7 @@
 Script to verify test user in the database
 """
 import asyncio
+from pymongo import ReturnDocument
 from app.models.user import User
 from app.config.database import init_database
 
@@ -13,29 +14,31 @@ async def verify_test_user():
         await init_database()
         print("✅ Database initialized")
         
-        # Find test user
-        user = await User.find_one(User.email == "test@example.com")
-        if not user:
+        # Setting the flag is idempotent, so find and update the user in a
+        # single round-trip, reading back only the fields we report
+        collection = User.get_motor_collection()
+        user = await collection.find_one_and_update(
+            {"email": "test@example.com"},
+            {"$set": {"is_verified": True}},
+            projection={"email": 1, "is_verified": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if user is None:
             print("❌ Test user not found")
             return
         
-        print(f"📧 Found user: {user.email}")
-        print(f"🔍 Current verification status: {user.is_verified}")
-        
-        # Update user to verified
-        if not user.is_verified:
-            await user.update({"$set": {"is_verified": True}})
-            print("✅ User verification status updated to True")
-        else:
-            print("✅ User is already verified")
-            
-        # Confirm the update
-        updated_user = await User.find_one(User.email == "test@example.com")
-        if updated_user:
-            print(f"🎉 Final verification status: {updated_user.is_verified}")
+        print(f"📧 Found user: {user['email']}")
+        print(f"🎉 Final verification status: {user['is_verified']}")
         
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
+    # Prefer the libuv-based event loop when it's installed
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     asyncio.run(verify_test_user())
\ No newline at end of file